@@ -1,25 +1,84 @@
+from time import perf_counter
+STARTUP_STARTED = perf_counter()  # --profile-startup measures from here
+
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox,
-    QCheckBox, QLineEdit, QMessageBox, QFileDialog, QGridLayout, QDialog, QRadioButton, QButtonGroup, QGroupBox
+    QCheckBox, QLineEdit, QMessageBox, QFileDialog, QGridLayout, QDialog, QRadioButton, QButtonGroup, QGroupBox,
+    QProgressDialog
 )
 from PyQt6.QtGui import QFont, QIcon
 from PyQt6.QtCore import QTimer, Qt
 
 import os
 import sys
+import argparse
+import importlib.util
 from time import time as current_time
 from datetime import datetime
+from threading import Thread
 
-import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+# matplotlib is imported by create_live_graph the first time the live graph is drawn; the
+# "Graph" window runs in its own process (TURTLE_Graph.py)
 
-import serial
-from serial.tools import list_ports
-from threading import Thread
+from TURTLE_Core import (
+    AcquisitionCore, RemoteCore, Frame, rate_command, RECORDINGS_DIR, STREAM_HOST, STREAM_PORT, EXPORT_WRITERS,
+    ProcessExportJob, SharedSeries, calculate_cooling_rates, recover_recording_logs, metrics_summary,
+    RecordingArchive, archive_path, find_archive, import_recording, minmax_decimate, RecordingEvent,
+    RecordingTrigger, LinkEvent
+)
+
+# Thermocouple panels per row, and panels shown before any device reports its channels
+PANEL_COLUMNS = 4
+DEFAULT_CHANNELS = 2
+
+# Live graph redraw cap and thermocouple panel refresh rate
+LIVE_PLOT_FPS = 5
+DISPLAY_REFRESH_HZ = 10
+
+# How often to look for a box again while none is connected (ms)
+CONNECT_RETRY_MS = 5000
+
+# Modules kept off the startup path; --profile-startup reports any that get loaded anyway
+DEFERRED_MODULES = ('pandas', 'matplotlib', 'xlsxwriter', 'pyarrow')
+
+# (label, seconds since launch) checkpoints for --profile-startup
+STARTUP_MARKS = []
+
+# Trigger choices: label -> (quantity, comparison), None for by hand
+TRIGGER_CONDITIONS = {
+    "By hand": None,
+    "Temperature below (°C)": ('temp', '<'),
+    "Temperature above (°C)": ('temp', '>'),
+    "Rate below (°C/min)": ('rate', '<'),
+    "Rate above (°C/min)": ('rate', '>'),
+}
+
+def mark_startup(label):
+    STARTUP_MARKS.append((label, perf_counter() - STARTUP_STARTED))
+
+def startup_report():
+    lines = ["Startup profile:"]
+    previous = 0.0
+    for label, elapsed in STARTUP_MARKS:
+        lines.append(f"  {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:7.1f} ms)  {label}")
+        previous = elapsed
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+    lines.append(f"  deferred modules loaded: {', '.join(loaded) or 'none'}")
+    return "\n".join(lines)
+
+mark_startup("imports")
 
 class ThermocoupleUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, ports=None, daemon_address=None):
         super().__init__()
+        # The window is a client of the acquisition core: in-process by default, or a running
+        # TURTLE_Daemon.py when daemon_address is given. ports given on the command line skip
+        # discovery.
+        if daemon_address is not None:
+            self.core = RemoteCore(*daemon_address)
+        else:
+            self.core = AcquisitionCore(ports=ports, shared_ring=True)
         self.setWindowTitle("AGGRC TURTLE App Version 3.6.3")
         self.setGeometry(100, 100, 400, 300)
         self.setCentralWidget(QWidget())
@@ -31,33 +90,60 @@ class ThermocoupleUI(QMainWindow):
         main_window_icon_path = os.path.join(self.resource_dir, 'Turtle_Icon.png')
         self.setWindowIcon(QIcon(main_window_icon_path))
 
+        # Unfinished logs are recovered on the connect worker; a daemon's are its own to recover
+        self.recover_on_connect = daemon_address is None
+        self.recovered = []
         self.default_connections()
         self.setup_ui()
-        self.start_reading_data()
 
     def default_connections(self):
-        #arduino connection
+        #arduino connections, one serial port per TURTLE box, opened in the background
         self.connected = False
-        self.ser = None
+        self.connect_thread = None
+        self.connect_errors = []
+        self.connect_timer = QTimer(self)
+        self.connect_timer.timeout.connect(self.check_connection)
+        self.profile_startup = False
         self.connect_to_arduino()
 
         #timing
-        self.start_time = None
         self.is_recording = False
 
         #list for data
-        self.temp_data = []
+        self.cooling_rate_cache = None
         self.temps_f = []
         self.temps_c = []
         self.connection_status_labels = []
+        self.channel_boxes = []
+
+        #past session opened with "Open Recording", graphed and exported instead of the last data
+        self.viewed_recording = None
+
+        #graph windows, each in its own process with the data it was opened on
+        self.graph_processes = []
+        self.graph_process_timer = QTimer(self)
+        self.graph_process_timer.timeout.connect(self.reap_graph_processes)
+
+        #background export
+        self.export_job = None
+        self.export_messages = None
+        self.export_timer = QTimer(self)
+        self.export_timer.timeout.connect(self.check_export)
 
         #timing
         self.timestamp_counter = 0
         self.sampling_rate = 1
+        self.averaging = 1
+        self.shown_rate = None
         
         #for enabling start button
         self.first_connection = True
 
+        #frames waiting to be shown, drained by display_timer
+        self.subscription = self.core.subscribe()
+        self.shown_temps = {}
+        self.shown_connected = {}
+
         #settings window defaults
         self.temp_unit = "C"
         self.theme = 'light'
@@ -76,37 +162,28 @@ class ThermocoupleUI(QMainWindow):
         tc_frame.setLayout(tc_layout)
         main_layout.addWidget(tc_frame)
 
-        for i in range(2):
-            row = i // 2
-            column = i % 2
-            
-            # Create a QGroupBox to hold the connection status and temperature labels
-            group_box = QGroupBox(f"Thermocouple {i+1}:")
-            group_box.setFont(self.font)
-            group_layout = QVBoxLayout()
-            group_box.setLayout(group_layout)
-            tc_layout.addWidget(group_box, row, column)
-
-            connection_status_label = QLabel("Not Connected")
-            connection_status_label.setFont(self.font)
-            connection_status_label.setStyleSheet("background-color: #333; color: #808080; padding: 5px; border-radius: 10px;")
-            group_layout.addWidget(connection_status_label)
-            self.connection_status_labels.append(connection_status_label)
-
-            temp_c = QLabel("N/A °C", font=self.font)
-            group_layout.addWidget(temp_c)
-            self.temps_c.append(temp_c)
+        # Channel panels are added as devices report them; see add_channel_panel
+        channels_frame = QWidget()
+        self.channels_layout = QGridLayout()
+        self.channels_layout.setContentsMargins(0, 0, 0, 0)
+        channels_frame.setLayout(self.channels_layout)
+        tc_layout.addWidget(channels_frame, 0, 0, 1, 2)
+        for i in range(DEFAULT_CHANNELS):
+            self.add_channel_panel()
 
         # Sampling Rate ComboBox (under the left thermocouple displays)
+        # Seconds between frames; Max sends one frame per thermocouple conversion. The boxes
+        # convert about every 100 ms, so faster rates would only repeat readings.
         self.sampling_rate_combobox = QComboBox()
-        sampling_rate_options = [f"Sample every {i} second(s)" for i in range(1, 6)]
-        sampling_rate_options.append("Max (≈ 3-4 samples/sec)")
-        self.sampling_rate_combobox.addItems(sampling_rate_options)
+        self.sampling_intervals = {f"{rate} samples/sec": 1 / rate for rate in (10, 5, 2)}
+        self.sampling_intervals.update({f"Sample every {i} second(s)": i for i in range(1, 6)})
+        self.sampling_intervals["Max (every conversion, ≈ 10 samples/sec)"] = 0
+        self.sampling_rate_combobox.addItems(list(self.sampling_intervals))
         self.sampling_rate_combobox.setCurrentText("Sample every 1 second(s)")
         self.sampling_rate_combobox.currentTextChanged.connect(self.update_sampling_rate)
         self.sampling_rate_combobox.setFont(self.font)
         self.sampling_rate_combobox.setFixedWidth(300)
-        tc_layout.addWidget(self.sampling_rate_combobox, 2, 0, 1, 1)  # Place in row 2, column 0
+        tc_layout.addWidget(self.sampling_rate_combobox, 1, 0, 1, 1)  # Place under the panels, column 0
 
         # Thermocouple Type ComboBox (under the right thermocouple displays)
         self.thermocouple_type_combobox = QComboBox()
@@ -116,7 +193,15 @@ class ThermocoupleUI(QMainWindow):
         self.thermocouple_type_combobox.currentTextChanged.connect(self.update_tc_type)
         self.thermocouple_type_combobox.setFont(self.font)
         self.thermocouple_type_combobox.setFixedWidth(300)
-        tc_layout.addWidget(self.thermocouple_type_combobox, 2, 1, 1, 1)  # Place in row 2, column 1
+        tc_layout.addWidget(self.thermocouple_type_combobox, 1, 1, 1, 1)  # Place under the panels, column 1
+
+        # On-device averaging of consecutive conversions (under the sampling rate)
+        self.averaging_combobox = QComboBox()
+        self.averaging_combobox.addItems(["No averaging"] + [f"Average {n} conversions" for n in (2, 4, 8, 16)])
+        self.averaging_combobox.currentTextChanged.connect(self.update_averaging)
+        self.averaging_combobox.setFont(self.font)
+        self.averaging_combobox.setFixedWidth(300)
+        tc_layout.addWidget(self.averaging_combobox, 2, 0, 1, 1)
      
         # Options Frame
         options_frame = QWidget()
@@ -139,6 +224,11 @@ class ThermocoupleUI(QMainWindow):
         elapsed_time_box.setLayout(elapsed_time_layout)
         self.elapsed_time_label = QLabel("Time Elapsed: 0s", font=self.font) # Create and add the elapsed time label to the layout
         elapsed_time_layout.addWidget(self.elapsed_time_label)
+        self.memory_label = QLabel("Samples: 0 (0.0 MB)")
+        elapsed_time_layout.addWidget(self.memory_label)
+        self.rate_label = QLabel("Achieved rate: -")
+        self.rate_label.setToolTip("Frames per second actually received from each TURTLE box")
+        elapsed_time_layout.addWidget(self.rate_label)
         options_layout.addWidget(elapsed_time_box) # Add the QGroupBox to the options layout
 
         # Graph Button
@@ -152,6 +242,7 @@ class ThermocoupleUI(QMainWindow):
 
         # Export Button
         self.export_button = QPushButton("Export Last Data to Excel")
+        self.export_button.setToolTip("Save as Excel, CSV or Parquet")
         self.export_button.setFont(self.font)
         self.export_button.setStyleSheet("background-color: blue;")
         excel_icon_path = os.path.join(self.resource_dir, 'Excel_Icon.ico')
@@ -159,6 +250,13 @@ class ThermocoupleUI(QMainWindow):
         self.export_button.clicked.connect(self.export_to_excel)
         options_layout.addWidget(self.export_button)
 
+        # Open Recording Button
+        self.open_button = QPushButton("Open Recording")
+        self.open_button.setToolTip("Graph or export a past recording or TURTLE_Data export")
+        self.open_button.setFont(self.font)
+        self.open_button.clicked.connect(self.open_recording)
+        options_layout.addWidget(self.open_button)
+
         # Cooling Rate Options Box
         cooling_rate_box = QGroupBox()  # "Cooling Rate Options:"
         cooling_rate_layout = QVBoxLayout()
@@ -197,348 +295,599 @@ class ThermocoupleUI(QMainWindow):
         # Add Cooling Rate Box to Options Layout
         options_layout.addWidget(cooling_rate_box)
 
+        # Triggers Box: start and stop recording on a temperature or a rate of change (negative
+        # while cooling), keeping the seconds before the start
+        trigger_box = QGroupBox()
+        trigger_layout = QGridLayout()
+        trigger_box.setLayout(trigger_layout)
+
+        self.start_trigger_combobox = QComboBox()
+        self.start_trigger_combobox.addItems([f"Start: {label}" for label in TRIGGER_CONDITIONS])
+        trigger_layout.addWidget(self.start_trigger_combobox, 0, 0)
+        self.start_trigger_entry = QLineEdit()
+        self.start_trigger_entry.setPlaceholderText("Start value")
+        trigger_layout.addWidget(self.start_trigger_entry, 0, 1)
+
+        self.stop_trigger_combobox = QComboBox()
+        self.stop_trigger_combobox.addItems([f"Stop: {label}" for label in TRIGGER_CONDITIONS])
+        trigger_layout.addWidget(self.stop_trigger_combobox, 1, 0)
+        self.stop_trigger_entry = QLineEdit()
+        self.stop_trigger_entry.setPlaceholderText("Stop value")
+        trigger_layout.addWidget(self.stop_trigger_entry, 1, 1)
+
+        self.trigger_channel_combobox = QComboBox()
+        self.trigger_channel_combobox.addItem("Any thermocouple")
+        self.trigger_channel_combobox.addItems([f"Thermocouple {i+1}" for i in range(len(self.channel_boxes))])
+        trigger_layout.addWidget(self.trigger_channel_combobox, 2, 0)
+        self.pre_trigger_entry = QLineEdit()
+        self.pre_trigger_entry.setPlaceholderText("Keep seconds before start")
+        trigger_layout.addWidget(self.pre_trigger_entry, 2, 1)
+
+        self.arm_button = QPushButton("Arm Triggers")
+        self.arm_button.setFont(self.font)
+        self.arm_button.clicked.connect(self.toggle_triggers)
+        trigger_layout.addWidget(self.arm_button, 3, 0, 1, 2)
+        options_layout.addWidget(trigger_box)
+        self.triggers_armed = False
+
+        # Live Graph (redrawn by graph_timer at most LIVE_PLOT_FPS times a second), created by
+        # create_live_graph once there is recorded data to show
+        self.live_graph_layout = QVBoxLayout()
+        self.layout.addLayout(self.live_graph_layout)
+        self.live_axes = None
+        self.live_lines = {}
+        self.graph_dirty = False
+        self.redrawing_graph = False
+
+        self.graph_timer = QTimer(self)
+        self.graph_timer.timeout.connect(self.refresh_live_graph)
+        self.graph_timer.start(1000 // LIVE_PLOT_FPS)
+
+        # Acquisition metrics in the status bar, details in its tooltip
+        self.metrics_label = QLabel()
+        self.statusBar().addPermanentWidget(self.metrics_label)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        self.metrics_timer.start(1000)
+
+        # Widgets are only touched from this timer on the GUI thread
+        self.display_timer = QTimer(self)
+        self.display_timer.timeout.connect(self.refresh_display)
+        self.display_timer.start(1000 // DISPLAY_REFRESH_HZ)
+
+    def add_channel_panel(self):
+        i = len(self.channel_boxes)
+        row = i // PANEL_COLUMNS
+        column = i % PANEL_COLUMNS
+
+        # Create a QGroupBox to hold the connection status and temperature labels
+        group_box = QGroupBox(f"Thermocouple {i+1}:")
+        group_box.setFont(self.font)
+        group_layout = QVBoxLayout()
+        group_box.setLayout(group_layout)
+        self.channels_layout.addWidget(group_box, row, column)
+        self.channel_boxes.append(group_box)
+
+        connection_status_label = QLabel("Not Connected")
+        connection_status_label.setFont(self.font)
+        connection_status_label.setStyleSheet("background-color: #333; color: #808080; padding: 5px; border-radius: 10px;")
+        group_layout.addWidget(connection_status_label)
+        self.connection_status_labels.append(connection_status_label)
+
+        temp_c = QLabel("N/A °C", font=self.font)
+        group_layout.addWidget(temp_c)
+        self.temps_c.append(temp_c)
+
+        if hasattr(self, 'trigger_channel_combobox'):
+            self.trigger_channel_combobox.addItem(f"Thermocouple {i+1}")
+
     def update_sampling_rate(self, rate):
-        if "Max" in rate:
-            rate_value = 0
-        else:
-            rate_value = int(rate.split(" ")[2])
-        self.sampling_rate = rate_value
-        self.send_to_arduino(f"RATE:{rate_value};")
+        self.sampling_rate = self.sampling_intervals[rate]
+        self.send_to_arduino(rate_command(self.sampling_rate))
+
+    def update_averaging(self, averaging):
+        self.averaging = 1 if averaging == "No averaging" else int(averaging.split(" ")[1])
+        self.send_to_arduino(f"AVG:{self.averaging};")
 
     def update_tc_type(self, type):
         tc_type = type.split(" ")[2]
-        self.send_to_arduino(f"TYPE:{tc_type}")
+        self.send_to_arduino(f"TYPE:{tc_type};")
 
     def start_reading_data(self):
-        self.reading_thread = Thread(target=self.read_data, daemon=True)
-        self.reading_thread.start()
-
-    def read_data(self):
-        while True:
-            if self.connected:
-                try:
-                    if self.ser.in_waiting > 0:
-                        line = self.ser.readline().decode('utf-8').strip()
-                        if "STATUS:" in line:
-                            _, statuses = line.split("STATUS:")
-                            temp_data = statuses.split(",")[:-1]
-                            data_collected = []
-                            for data in temp_data:
-                                tc, status = data.split(":")
-                                index = int(tc[1]) - 1
-
-                                if status == "Not Connected":
-                                    self.connection_status_labels[index].setText("Not Connected")
-                                    self.connection_status_labels[index].setStyleSheet("background-color: #333; color:rgb(203, 199, 199); padding: 5px; border-radius: 10px;")
-                                    self.temps_c[index].setText("N/A °C")
-                                else:
-                                    if self.first_connection:
-                                        self.start_button.setEnabled(True)
-                                        self.first_connection = False
-                                    self.connection_status_labels[index].setText("Connected")
-                                    self.connection_status_labels[index].setStyleSheet("background-color: green;")
-                                    temp_c = float(status)
-                                    self.temps_c[index].setText(f"{temp_c:.2f}°C")
-
-                                    if self.is_recording:
-                                        elapsed_time = current_time() - self.start_time
-                                        new_reading = {
-                                            'timestamp': round(elapsed_time, 2),
-                                            'tc_id': index + 1,
-                                            'temp_c': temp_c
-                                        }
-                                        self.temp_data.append(new_reading)
-                                        self.update_graph()
-                except Exception as e:
-                    pass
+        if not self.connected:
+            return
+        self.core.start()
+
+    def refresh_display(self):
+        # Coalesce everything queued since the last tick to the newest reading per channel
+        latest = {}
+        now = perf_counter()
+        for item in self.subscription.drain():
+            if isinstance(item, RecordingEvent):
+                self.recording_event(item)
+            elif isinstance(item, LinkEvent):
+                self.link_event(item)
+            elif isinstance(item, Frame):
+                # Replayed pre-trigger frames only add to the graph; they were shown when live
+                if not item.replayed:
+                    self.core.stats.display_latency.add((now - item.received_at) * 1000)
+                    for index, temp_c in item.readings:
+                        latest[index] = temp_c
+                if item.elapsed is not None:
+                    self.update_graph()
+
+        for index, temp_c in latest.items():
+            while index >= len(self.temps_c):
+                self.add_channel_panel()
+            if index not in self.shown_connected:
+                self.channel_boxes[index].setTitle(self.core.channel_title(index))
+            connected = temp_c is not None
+            if self.shown_connected.get(index) != connected:
+                if connected:
+                    self.connection_status_labels[index].setText("Connected")
+                    self.connection_status_labels[index].setStyleSheet("background-color: green;")
+                else:
+                    self.connection_status_labels[index].setText("Not Connected")
+                    self.connection_status_labels[index].setStyleSheet("background-color: #333; color:rgb(203, 199, 199); padding: 5px; border-radius: 10px;")
+                self.shown_connected[index] = connected
+
+            text = f"{temp_c:.2f}°C" if connected else "N/A °C"
+            if self.shown_temps.get(index) != text:
+                self.temps_c[index].setText(text)
+                self.shown_temps[index] = text
+
+            if connected and self.first_connection:
+                self.start_button.setEnabled(True)
+                self.first_connection = False
+
+        rates = self.core.effective_rates()
+        text = f"Achieved rate: {', '.join(f'{rate:.1f}' for rate in rates.values())} Hz" if rates else "Achieved rate: -"
+        if text != self.shown_rate:
+            self.rate_label.setText(text)
+            self.shown_rate = text
+
+    def refresh_metrics(self):
+        if not self.connected:
+            return
+        metrics = self.core.metrics()
+        self.metrics_label.setText(metrics_summary(metrics))
+        lines = []
+        for device in metrics['devices']:
+            line = (f"{device.get('port', 'device')}: {device['frames']} frames, {device.get('malformed', 0)} malformed, "
+                    f"{device.get('lost_frames', 0)} lost, {device.get('dropped_frames', 0)} dropped, {device['gaps']} gaps")
+            if device.get('clock_drift_ppm') is not None:
+                line += f", clock drift {device['clock_drift_ppm']} ppm"
+            if device.get('disconnects'):
+                line += f", {device['disconnects']} disconnects ({device['downtime_s']} s down)"
+            if not device.get('connected', True):
+                line += f", reconnecting: {device['error']}"
+            elif device.get('error'):
+                line += f", stopped: {device['error']}"
+            lines.append(line)
+        for name, key in (("Reader to recording", 'consumer_latency_ms'), ("Reader to screen", 'display_latency_ms')):
+            latency = metrics[key]
+            if latency['count']:
+                lines.append(f"{name}: p50 {latency['p50']} ms, p99 {latency['p99']} ms, max {latency['max']:.1f} ms")
+        if metrics['exports']:
+            lines.append(f"Last export: {metrics['exports'][-1]['seconds']} s")
+        self.metrics_label.setToolTip("\n".join(lines))
 
     def toggle_recording(self):
         if self.is_recording:
-            self.is_recording = False
-            self.start_button.setText("Start Recording")
-            self.start_button.setStyleSheet("background-color: green;")
+            self.core.stop_recording()
+            if self.core.recording_path:
+                self.statusBar().showMessage(f"Recording saved to {self.core.recording_path}")
+            self.show_recording_state(False)
         else:
-            self.is_recording = True
+            error = self.core.start_recording()
+            if error:
+                QMessageBox.information(self, "Recording Error", error)
+            elif self.core.recording_path:
+                self.statusBar().showMessage(f"Recording to {self.core.recording_path}")
+            self.show_recording_state(True)
+
+    def show_recording_state(self, recording):
+        self.is_recording = recording
+        if recording:
+            self.viewed_recording = None
+            self.update_graph()
             self.start_button.setText("Stop Recording")
             self.start_button.setStyleSheet("background-color: red;")
-            self.start_time = current_time()
-            self.temp_data = []
             self.update_elapsed_time()
+        else:
+            self.start_button.setText("Start Recording")
+            self.start_button.setStyleSheet("background-color: green;")
 
-    def update_elapsed_time(self):
-        if self.is_recording:
-            elapsed_time = round(current_time() - self.start_time, 2)
-            self.elapsed_time_label.setText(f"Time Elapsed: {elapsed_time}s")
-            QTimer.singleShot(1000, self.update_elapsed_time)
-
-    def calculate_cooling_rate_tc1(self, df, interval1, interval2):
-        return self._calculate_cooling_rate(df, interval1, interval2, "Thermocouple 1")
-
-    def calculate_cooling_rate_tc2(self, df, interval3, interval4):
-        return self._calculate_cooling_rate(df, interval3, interval4, "Thermocouple 2")
+    def recording_event(self, event):
+        # Recordings started or stopped by a trigger (or by another client of the daemon) show
+        # up here; the ones started with the button are already shown
+        if event.trigger and event.recording:
+            self.statusBar().showMessage(f"Recording started on {event.trigger}: {event.path or 'in memory'}")
+        elif event.trigger:
+            self.statusBar().showMessage(f"Recording stopped on {event.trigger}, saved to {event.path}")
+        if self.core.is_recording != self.is_recording:
+            self.show_recording_state(self.core.is_recording)
+        # A start trigger fires once, which disarms the core; a stop trigger stays set until
+        # disarmed by hand, so the triggers only show as disarmed when there is none
+        stop_set = self.stop_trigger_combobox.currentText() != "Stop: By hand"
+        if event.trigger and event.recording and self.triggers_armed and not self.core.armed and not stop_set:
+            self.show_triggers_state(self.core.armed)
+
+    def link_event(self, event):
+        # A lost box is reconnected by the core; only report it, without blocking the window
+        if event.connected:
+            message = f"Reconnected to {event.port} after {event.at - event.since:.1f} s"
+            if event.gap:
+                message += f", gap from {event.gap[0]} s to {event.gap[1]} s marked in the recording"
+        elif event.attempts:
+            message = f"Lost {event.port}, reconnect attempt {event.attempts} failed: {event.error}"
+        else:
+            message = f"Lost {event.port} ({event.error}), reconnecting..."
+        self.statusBar().showMessage(message)
+        self.refresh_metrics()
+
+    def trigger_from_ui(self, combobox, entry):
+        # RecordingTrigger for one row of the Triggers box; None for by hand. Raises ValueError.
+        condition = TRIGGER_CONDITIONS[combobox.currentText().split(": ", 1)[1]]
+        if condition is None:
+            return None
+        channel = self.trigger_channel_combobox.currentIndex()
+        return RecordingTrigger(*condition, float(entry.text()), channel or None)
 
-    def _calculate_cooling_rate(self, df, interval_start, interval_end, label):
+    def toggle_triggers(self):
+        if self.triggers_armed:
+            self.core.disarm()
+            self.show_triggers_state(False)
+            return
         try:
-            interval_start = float(interval_start)
-            interval_end = float(interval_end)
+            start = self.trigger_from_ui(self.start_trigger_combobox, self.start_trigger_entry)
+            stop = self.trigger_from_ui(self.stop_trigger_combobox, self.stop_trigger_entry)
+            pre_trigger = float(self.pre_trigger_entry.text() or 0)
         except ValueError:
-            QMessageBox.information(self, "Error", f"Please enter valid numerical values for {label}.")
-            return None
+            QMessageBox.information(self, "Error", "Please enter valid numerical values for the triggers.")
+            return
+        if start is None and stop is None and not pre_trigger:
+            QMessageBox.information(self, "Error", "Choose a start or stop condition, or seconds to keep before the start.")
+            return
+        self.core.arm(start, stop, pre_trigger)
+        self.show_triggers_state(True)
+        conditions = [f"start on {start.describe()}" if start else None, f"stop on {stop.describe()}" if stop else None]
+        self.statusBar().showMessage("Triggers armed: " + (", ".join(c for c in conditions if c) or f"keeping {pre_trigger:g} s before each start"))
+
+    def show_triggers_state(self, armed):
+        self.triggers_armed = armed
+        self.arm_button.setText("Disarm Triggers" if armed else "Arm Triggers")
+        for widget in (self.start_trigger_combobox, self.start_trigger_entry, self.stop_trigger_combobox,
+                       self.stop_trigger_entry, self.trigger_channel_combobox, self.pre_trigger_entry):
+            widget.setEnabled(not armed)
+
+    def create_live_graph(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg, NavigationToolbar2QT
+
+        self.live_figure = Figure(figsize=(8, 3), tight_layout=True)
+        self.live_canvas = FigureCanvasQTAgg(self.live_figure)
+        self.live_axes = self.live_figure.add_subplot()
+        self.live_axes.set_xlabel('Elapsed Time (s)')
+        self.live_axes.set_ylabel(f'Temperature (°{self.temp_unit})')
+        self.live_axes.callbacks.connect('xlim_changed', self.on_live_xlim_changed)
+        self.live_graph_layout.addWidget(NavigationToolbar2QT(self.live_canvas, self))
+        self.live_graph_layout.addWidget(self.live_canvas)
+
+    def update_graph(self):
+        # Only marks the graph stale; the GUI timer redraws it at most once per tick
+        self.graph_dirty = True
+
+    def on_live_xlim_changed(self, axes):
+        # Zooming or panning needs a new decimation for the visible range
+        if not self.redrawing_graph:
+            self.graph_dirty = True
+
+    def refresh_live_graph(self):
+        if not self.graph_dirty:
+            return
+        if self.live_axes is None:
+            if not self.core.samples:
+                return
+            self.create_live_graph()
+        self.graph_dirty = False
+        self.redrawing_graph = True
+        try:
+            # Follow the newest data unless the user has zoomed or panned with the toolbar
+            following = self.live_axes.get_autoscalex_on()
+            x_min, x_max = self.live_axes.get_xlim()
+            buckets = max(self.live_canvas.width() // 2, 1)
+            channels = self.core.samples.channels()
+            for tc_id in list(self.live_lines):
+                if tc_id not in channels:
+                    self.live_lines.pop(tc_id).remove()
+            for tc_id in channels:
+                timestamps, temps = self.core.samples.view(tc_id)
+                if following:
+                    x_min, x_max = -np.inf, np.inf
+                x, y = minmax_decimate(timestamps, temps, x_min, x_max, buckets)
+                line = self.live_lines.get(tc_id)
+                if line is None:
+                    line, = self.live_axes.plot(x, y, label=f'Thermocouple {tc_id}')
+                    self.live_lines[tc_id] = line
+                    self.live_axes.legend(loc='upper left')
+                else:
+                    line.set_data(x, y)
+            self.live_axes.relim()
+            self.live_axes.autoscale_view(scalex=following)
+            self.live_canvas.draw_idle()
+        finally:
+            self.redrawing_graph = False
 
-        cooling_rates = {}
-        grouped = df.groupby('tc_id')
-
-        for tc_id, group in grouped:
-            group = group.reset_index(drop=True)
-
-            # Find the closest temperatures to the specified intervals
-            interval1_index = (group['temp_c'] - interval_start).abs().idxmin()
-            interval2_index = (group['temp_c'] - interval_end).abs().idxmin()
-
-            interval1_row = group.loc[interval1_index]
-            interval2_row = group.loc[interval2_index]
-
-            if not interval1_row.empty and not interval2_row.empty:
-                interval1_temp = interval1_row['temp_c']
-                interval2_temp = interval2_row['temp_c']
-                interval1_time = interval1_row['timestamp']
-                interval2_time = interval2_row['timestamp']
-                cooling_rate = ((interval2_temp - interval1_temp) / (interval2_time - interval1_time)) * 60
-                cooling_rate = round(cooling_rate, 2)  # Limit to 2 decimal places
-
-                cooling_rates[tc_id] = {
-                    'cooling_rate': cooling_rate,
-                    'interval1_temp': interval1_temp,
-                    'interval2_temp': interval2_temp,
-                    'interval1_time': interval1_time,
-                    'interval2_time': interval2_time
-                }
-            else:
-                cooling_rates[tc_id] = None
-
-        if not cooling_rates:
-            QMessageBox.information(self, "Error", f"No data found for {label} intervals.")
-            return None
+    def update_elapsed_time(self):
+        if self.is_recording:
+            elapsed_time = round(current_time() - (self.core.start_time or current_time()), 2)
+            self.elapsed_time_label.setText(f"Time Elapsed: {elapsed_time}s")
+            self.memory_label.setText(f"Samples: {len(self.core.samples)} ({self.core.samples.nbytes() / 1e6:.1f} MB)")
+            QTimer.singleShot(1000, self.update_elapsed_time)
 
-        return cooling_rates
+    def cooling_rate_requests(self):
+        # (tc_id, start temp, end temp) for every checked cooling rate box
+        requests = []
+        boxes = [
+            (1, self.calculate_cooling_check_1, self.entry_interval_1, self.entry_interval_2),
+            (2, self.calculate_cooling_check_2, self.entry_interval_3, self.entry_interval_4)
+        ]
+        for tc_id, check, start_entry, end_entry in boxes:
+            if check.isChecked():
+                try:
+                    requests.append((tc_id, float(start_entry.text()), float(end_entry.text())))
+                except ValueError:
+                    QMessageBox.information(self, "Error", f"Please enter valid numerical values for Thermocouple {tc_id}.")
+        return requests
+
+    def cooling_rates(self, samples):
+        # {tc_id: result dict or None} for the checked boxes, shared by the graph and the export
+        # and only recomputed when the data or the requested intervals change
+        requests = self.cooling_rate_requests()
+        if not requests:
+            return {}
+        key = (id(samples), samples.version, tuple(requests))
+        if self.cooling_rate_cache is None or self.cooling_rate_cache[0] != key:
+            results = calculate_cooling_rates(samples, [(start, end) for _, start, end in requests])
+            rates = {}
+            for i, (tc_id, _, _) in enumerate(requests):
+                rates[tc_id] = results[tc_id][i] if tc_id in results else None
+            self.cooling_rate_cache = (key, rates)
+
+        rates = self.cooling_rate_cache[1]
+        missing = [f"Thermocouple {tc_id}" for tc_id, rate in rates.items() if rate is None]
+        if missing:
+            QMessageBox.information(self, "Error", f"No data found for {', '.join(missing)} intervals.")
+        return rates
+
+    def analysis_samples(self):
+        # The opened past recording if there is one, else the last recorded data
+        if self.viewed_recording is not None:
+            return self.viewed_recording
+        return self.core.recorded_samples()
 
     def show_graph(self):
-        if not self.temp_data:
+        samples = self.analysis_samples()
+        if not samples:
             QMessageBox.information(self, "No Data", "No temperature data to plot.")
             return
 
-        df = pd.DataFrame(self.temp_data)
-
-        plt.figure(figsize=(10, 6))
-
-        cooling_rates_tc1 = {}
-        cooling_rates_tc2 = {}
-
-        # Calculate cooling rate for Thermocouple 1 if checked
-        if self.calculate_cooling_check_1.isChecked():
-            interval1 = self.entry_interval_1.text()
-            interval2 = self.entry_interval_2.text()
-            cooling_rates_tc1 = self.calculate_cooling_rate_tc1(df, interval1, interval2)
-
-        # Calculate cooling rate for Thermocouple 2 if checked
-        if self.calculate_cooling_check_2.isChecked():
-            interval3 = self.entry_interval_3.text()
-            interval4 = self.entry_interval_4.text()
-            cooling_rates_tc2 = self.calculate_cooling_rate_tc2(df, interval3, interval4)
-
-        # Plot the temperature data for each thermocouple
-        for tc_id in df['tc_id'].unique():
-            tc_df = df[df['tc_id'] == tc_id]
-            plt.plot(tc_df['timestamp'], tc_df['temp_c'], label=f'Thermocouple {tc_id}')
-
-        # Add legend
-        plt.legend(loc='upper left')
-
-        # Determine the position for the cooling rate text boxes
-        xlims = plt.xlim()  # Get x-axis limits
-        ylims = plt.ylim()  # Get y-axis limits
-
-        # Place the cooling rate text boxes in the upper right corner of the plot
-        text_x = xlims[1] - 0.1 * (xlims[1] - xlims[0])  # Near the right edge
-        text_y = ylims[1] - 0.2 * (ylims[1] - ylims[0])  # Near the top, but not too close
-
-        # Display cooling rate only for Thermocouple 1 if checked
-        if self.calculate_cooling_check_1.isChecked():
-            if 1 in cooling_rates_tc1:  # Only display if TC1 has a cooling rate
-                data = cooling_rates_tc1[1]
-                if data:
-                    cooling_rate = data['cooling_rate']
-                    interval1_temp = data['interval1_temp']
-                    interval2_temp = data['interval2_temp']
-
-                    textstr = f'TC 1 Cooling rate: {cooling_rate:.2f}°{self.temp_unit}/min\n' \
-                            f'Interval: {interval1_temp:.2f}°{self.temp_unit} to {interval2_temp:.2f}°{self.temp_unit}'
-
-                    plt.text(text_x, text_y, textstr, fontsize=10, color='red',
-                            verticalalignment='top', horizontalalignment='right',
-                            bbox=dict(facecolor='white', alpha=0.5))
-                    text_y -= 0.1 * (ylims[1] - ylims[0])  # Adjust vertical spacing
-
-        # Display cooling rate only for Thermocouple 2 if checked
-        if self.calculate_cooling_check_2.isChecked():
-            if 2 in cooling_rates_tc2:  # Only display if TC2 has a cooling rate
-                data = cooling_rates_tc2[2]
-                if data:
-                    cooling_rate = data['cooling_rate']
-                    interval3_temp = data['interval1_temp']
-                    interval4_temp = data['interval2_temp']
-
-                    textstr = f'TC 2 Cooling rate: {cooling_rate:.2f}°{self.temp_unit}/min\n' \
-                            f'Interval: {interval3_temp:.2f}°{self.temp_unit} to {interval4_temp:.2f}°{self.temp_unit}'
-
-                    plt.text(text_x, text_y, textstr, fontsize=10, color='blue',
-                            verticalalignment='top', horizontalalignment='right',
-                            bbox=dict(facecolor='white', alpha=0.5))
-                    text_y -= 0.1 * (ylims[1] - ylims[0])  # Adjust vertical spacing
-
-        plt.xlabel('Elapsed Time (s)')
-        plt.ylabel(f'Temperature (°{self.temp_unit})')
-        plt.title('Thermocouple Temperature Data')
-        plt.tight_layout()  # Adjust layout to fit text
-        plt.show()
+        import multiprocessing
+        from TURTLE_Graph import graph_process
+
+        # Cooling rates for the checked thermocouples
+        cooling_rates = self.cooling_rates(samples)
+
+        # A recording still in progress keeps growing in the window through the frame ring;
+        # the ring position is taken first so no frame falls between it and the snapshot
+        frame_ring = getattr(self.core, 'frame_ring', None)
+        follow = frame_ring is not None and self.viewed_recording is None and self.is_recording
+        ring_position = frame_ring.write_count() if follow else None
+        try:
+            shared = SharedSeries(samples)
+        except (OSError, ValueError) as e:
+            QMessageBox.information(self, "Graph Error", f"Failed to open the graph. Error: {e}")
+            return
+        process = multiprocessing.get_context('spawn').Process(
+            target=graph_process, daemon=True,
+            args=(shared, self.temp_unit, cooling_rates, frame_ring.name if follow else None, ring_position)
+        )
+        process.start()
+        self.graph_processes.append((process, shared))
+        self.graph_process_timer.start(1000)
+
+    def reap_graph_processes(self):
+        # Free the shared copy of the data once its window has been closed
+        for process, shared in list(self.graph_processes):
+            if not process.is_alive():
+                shared.close()
+                self.graph_processes.remove((process, shared))
+        if not self.graph_processes:
+            self.graph_process_timer.stop()
 
     def export_to_excel(self):
-        if not self.temp_data:
+        samples = self.analysis_samples()
+        if not samples:
             QMessageBox.information(self, "No Data", "No temperature data to export.")
             return
+        if self.export_job is not None and not self.export_job.done:
+            QMessageBox.information(self, "Export Running", "An export is already in progress.")
+            return
 
-        # Convert the temperature data to a DataFrame
-        df = pd.DataFrame(self.temp_data)
-
-        # Initialize cooling rate data
-        cooling_rates_tc1 = {}
-        cooling_rates_tc2 = {}
-
-        # Check if cooling rate calculation is enabled and calculate accordingly
-        if self.calculate_cooling_check_1.isChecked():
-            interval1 = self.entry_interval_1.text()
-            interval2 = self.entry_interval_2.text()
-            cooling_rates_tc1 = self.calculate_cooling_rate_tc1(df, interval1, interval2)
-
-        if self.calculate_cooling_check_2.isChecked():
-            interval3 = self.entry_interval_3.text()
-            interval4 = self.entry_interval_4.text()
-            cooling_rates_tc2 = self.calculate_cooling_rate_tc2(df, interval3, interval4)
-
-        # Pivot the DataFrame to get the desired format
-        df_pivot = df.pivot_table(index='timestamp', columns='tc_id', values='temp_c').reset_index()
-        df_pivot.columns.name = None  # Remove the index name for better readability
-        df_pivot.rename(columns={'timestamp': 'Elapsed Time (s)'}, inplace=True)
-        df_pivot.columns = [f'Thermocouple {int(col)} (°{self.temp_unit})' if isinstance(col, int) else col for col in df_pivot.columns]
+        # Cooling rates are shared with show_graph through the cache
+        cooling_rates = self.cooling_rates(samples)
 
         default_filename = f"TURTLE_Data_{datetime.now().strftime('%m-%d-%y_%H-%M-%S')}.xlsx"
+        file_types = {"Excel Files (*.xlsx)": '.xlsx', "CSV Files (*.csv)": '.csv', "Parquet Files (*.parquet)": '.parquet'}
 
         # Get the path to save the file with a default filename and location
-        filename, _ = QFileDialog.getSaveFileName(self, "Save File", default_filename, "Excel Files (*.xlsx)")
-        if filename:
-            # Create an Excel writer object with xlsxwriter as the engine
-            with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
-                df_pivot.to_excel(writer, sheet_name='Temperature Data', index=False)
-
-                workbook = writer.book
-                temperature_sheet = writer.sheets['Temperature Data']
-
-                # Format columns for better visibility
-                for col_num, value in enumerate(df_pivot.columns.values):
-                    temperature_sheet.set_column(col_num, col_num, max(len(value), 15))
-
-                # Create a line chart
-                chart = workbook.add_chart({'type': 'line'})
-                num_rows = len(df_pivot)
-
-                # Add thermocouple data series to the chart
-                tc_index = 1  # Thermocouple index counter
-                for col_num in range(1, len(df_pivot.columns)):
-                    col_letter = chr(65 + col_num)
-                    chart.add_series({
-                        'name': f'Thermocouple {tc_index}',
-                        'categories': f'={temperature_sheet.name}!$A$2:$A${num_rows+1}',
-                        'values': f'={temperature_sheet.name}!${col_letter}$2:${col_letter}${num_rows+1}',
-                    })
-                    tc_index += 1
-
-                # Configure the chart layout
-                chart.set_title({'name': 'Thermocouple Temperature Data'})
-                chart.set_x_axis({'name': 'Elapsed Time (s)'})
-                chart.set_y_axis({'name': f'Temperature (°{self.temp_unit})'})
-                chart.set_legend({'position': 'bottom'})
-
-                # Insert the chart to the right of the data (Column F)
-                temperature_sheet.insert_chart(f'F2', chart)
-
-                # Insert cooling rate information below the graph
-                row_offset = num_rows + 5  # Ensure the information appears clearly below the graph
-                temperature_sheet.write(row_offset, 5, 'Cooling Rate Information:')
-
-                row = row_offset + 1
-                if self.calculate_cooling_check_1.isChecked() and cooling_rates_tc1:
-                    if 1 in cooling_rates_tc1 and cooling_rates_tc1[1]:  # Ensure data exists
-                        data = cooling_rates_tc1[1]
-                        temperature_sheet.write(row, 5, 'Thermocouple 1:')
-                        temperature_sheet.write(row + 1, 5, f'Cooling Rate: {data["cooling_rate"]}°{self.temp_unit}/min')
-                        temperature_sheet.write(row + 2, 5, f'Interval 1 Temp: {data["interval1_temp"]}°{self.temp_unit}')
-                        temperature_sheet.write(row + 3, 5, f'Interval 2 Temp: {data["interval2_temp"]}°{self.temp_unit}')
-                        temperature_sheet.write(row + 4, 5, f'Interval 1 Time: {data["interval1_time"]}s')
-                        temperature_sheet.write(row + 5, 5, f'Interval 2 Time: {data["interval2_time"]}s')
-                        row += 7  # Move to the next block for the next thermocouple
-
-                if self.calculate_cooling_check_2.isChecked() and cooling_rates_tc2:
-                    if 2 in cooling_rates_tc2 and cooling_rates_tc2[2]:  # Ensure data exists
-                        data = cooling_rates_tc2[2]
-                        temperature_sheet.write(row, 5, 'Thermocouple 2:')
-                        temperature_sheet.write(row + 1, 5, f'Cooling Rate: {data["cooling_rate"]}°{self.temp_unit}/min')
-                        temperature_sheet.write(row + 2, 5, f'Interval 1 Temp: {data["interval1_temp"]}°{self.temp_unit}')
-                        temperature_sheet.write(row + 3, 5, f'Interval 2 Temp: {data["interval2_temp"]}°{self.temp_unit}')
-                        temperature_sheet.write(row + 4, 5, f'Interval 1 Time: {data["interval1_time"]}s')
-                        temperature_sheet.write(row + 5, 5, f'Interval 2 Time: {data["interval2_time"]}s')
-                        row += 7  # Move to the next block
-
-                if row == row_offset + 1:  # If no cooling rate data was written
-                    temperature_sheet.write(row_offset + 2, 5, 'No cooling rate data available.')
-
-            # Notify user of the successful export
-            QMessageBox.information(self, "Export Success", f"Temperature data successfully exported to:\n{filename}")
-
-
-    def find_arduino_port(self):
-        ports = list_ports.comports()
-        for port in ports:
-            if "Arduino" in port.description:
-                return port.device
-            if "VID:PID=2341:0043" in port.hwid or "VID:PID=0403:6001" in port.hwid or "VID:PID=2341:0043" in port.hwid or "VID:PID=2A03:0010" in port.hwid or "VID:PID=1A86:7523" in port.hwid:
-                return port.device
-        return None
+        filename, selected_type = QFileDialog.getSaveFileName(self, "Save File", default_filename, ";;".join(file_types))
+        if not filename:
+            return
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in EXPORT_WRITERS:
+            extension = file_types.get(selected_type, '.xlsx')
+            filename += extension
+        # Only checked for here; pyarrow itself is imported by the export process
+        if extension == '.parquet' and importlib.util.find_spec('pyarrow') is None:
+            QMessageBox.information(self, "Export Error", "Parquet export needs the pyarrow package.")
+            return
 
-    def connect_to_arduino(self):
-        if not self.connected:  # Check if already connected
-            arduino_port = self.find_arduino_port()
-            if arduino_port is not None:
-                try:
-                    self.ser = serial.Serial(arduino_port, 9600, timeout=1)
-                    self.connected = True
-                    self.send_to_arduino("TYPE:T;")
-                    self.send_to_arduino("RATE:1;")
+        # The data is shared with the export process as it is now; later samples are not included
+        try:
+            series = SharedSeries(samples)
+        except (OSError, ValueError) as e:
+            QMessageBox.information(self, "Export Error", f"Failed to export temperature data. Error: {e}")
+            return
+        job = ProcessExportJob(EXPORT_WRITERS[extension], filename, series, self.temp_unit, cooling_rates)
+        self.start_export_job(job, "Export", "Exporting temperature data...", "Failed to export temperature data.",
+                              self.export_succeeded)
+
+    def export_succeeded(self, job):
+        self.core.stats.export_finished(job.path, job.duration)
+        self.core.save_metrics()
+        # Notify user of the successful export
+        QMessageBox.information(self, "Export Success", f"Temperature data successfully exported to:\n{job.path}")
+
+    def open_recording(self):
+        if self.export_job is not None and not self.export_job.done:
+            QMessageBox.information(self, "Export Running", "An export is already in progress.")
+            return
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Open Recording", RECORDINGS_DIR, "TURTLE Recordings (*.csv *.xlsx *.parquet meta.json)"
+        )
+        if not filename:
+            return
+        archive = find_archive(filename)
+        if archive is not None:
+            self.show_recording(archive)
+            return
+        # First open, or the file changed since: index it into an archive next to the file
+        job = ProcessExportJob(import_recording, archive_path(filename), filename)
+        self.start_export_job(job, "Open Recording", f"Indexing {os.path.basename(filename)}...",
+                              "Failed to open the recording.", lambda job: self.show_recording(job.path))
 
-                except Exception as e:
-                    QMessageBox.information(self, "Connection Error", f"Failed to connect to Arduino: {e}")
-            else:
-                QMessageBox.information(self, "Connection Error", "Arduino not found")
+    def show_recording(self, path):
+        try:
+            recording = RecordingArchive(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.information(self, "Open Recording Error", f"Failed to open the recording. Error: {e}")
+            return
+        self.viewed_recording = recording
+        time_range = recording.time_range()
+        span = f", {time_range[0]:.1f}-{time_range[1]:.1f} s" if time_range else ""
+        self.statusBar().showMessage(f"Viewing {os.path.basename(path)} ({len(recording)} samples{span})")
+
+    def start_export_job(self, job, title, label, failure, on_success):
+        self.export_job = job
+        self.export_messages = (title, failure, on_success)
+        self.export_progress = QProgressDialog(label, "Cancel", 0, 100, self)
+        self.export_progress.setWindowTitle(title)
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.canceled.connect(self.export_job.cancel)
+        self.export_job.start()
+        self.export_timer.start(100)
+
+    def check_export(self):
+        job = self.export_job
+        self.export_progress.setValue(int(job.progress * 100))
+        if not job.done:
+            return
+        self.export_timer.stop()
+        self.export_progress.canceled.disconnect()
+        self.export_progress.close()
+
+        title, failure, on_success = self.export_messages
+        if job.error is not None:
+            QMessageBox.information(self, f"{title} Error", f"{failure} Error: {job.error}")
+        elif job.cancelled():
+            self.statusBar().showMessage(f"{title} cancelled")
+        else:
+            on_success(job)
+
+    def connect_to_arduino(self):
+        # Port discovery and the binary protocol handshake can take seconds, so they run on a
+        # worker thread while the window comes up; check_connection picks up the result
+        if not self.connected and self.connect_thread is None:  # Check if already connected
+            self.connect_thread = Thread(target=self.connect_in_background, daemon=True)
+            self.connect_thread.start()
+            self.connect_timer.start(100)
+
+    def connect_in_background(self):
+        # Recovery reads through leftover logs, which can be gigabytes, so it runs here rather
+        # than before the window is shown; it finishes before any new recording can start
+        if self.recover_on_connect:
+            self.recover_on_connect = False
+            self.recovered = recover_recording_logs(RECORDINGS_DIR)
+        self.connect_errors = self.core.connect()
+
+    def check_connection(self):
+        if self.connect_thread.is_alive():
+            return
+        self.connect_timer.stop()
+        self.connect_thread = None
+        self.connected = self.core.connected
+        mark_startup("ports connected" if self.connected else "port discovery finished")
+        recovered, self.recovered = self.recovered, []
+        messages = [f"Recovered {len(recovered)} unfinished recording(s) in {RECORDINGS_DIR}"] if recovered else []
+        if self.connected:
+            # Settings picked while the ports were opening were not sent yet
+            if self.sampling_rate != 1:
+                self.send_to_arduino(rate_command(self.sampling_rate))
+            if self.averaging != 1:
+                self.send_to_arduino(f"AVG:{self.averaging};")
+            if self.thermocouple_type_combobox.currentText() != "Thermocouple Type T":
+                self.update_tc_type(self.thermocouple_type_combobox.currentText())
+            self.start_reading_data()
+        if self.profile_startup:
+            report = startup_report()
+            if self.connect_errors:
+                report += "\n  connection: " + "; ".join(self.connect_errors)
+            print(report, file=sys.stderr)
+            QApplication.quit()
+        elif not self.connected:
+            # Keep looking, so a box plugged in after the app started is picked up
+            self.statusBar().showMessage("; ".join(messages + self.connect_errors) + f", retrying every {CONNECT_RETRY_MS // 1000} s")
+            QTimer.singleShot(CONNECT_RETRY_MS, self.connect_to_arduino)
+        elif messages or self.connect_errors:
+            self.statusBar().showMessage("; ".join(messages + self.connect_errors))
 
     def send_to_arduino(self, message):
-        if self.connected and self.ser:
-            try:
-                self.ser.write(message.encode())
-            except Exception as e:
-                QMessageBox.information(self, "Error", f"Error sending data to Arduino. Error: {e}")
+        if self.connected:
+            errors = self.core.send(message)
+            if errors:
+                self.statusBar().showMessage("; ".join(errors))
+
+    def closeEvent(self, event):
+        for process, _ in self.graph_processes:
+            process.terminate()
+            process.join(1)
+        self.reap_graph_processes()
+        self.core.close()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    # Graph and export processes start this script again; a frozen build must not rerun the app
+    import multiprocessing
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="AGGRC TURTLE temperature logger")
+    parser.add_argument('--port', action='append', help="serial port to use instead of auto-detection (repeatable), e.g. a TURTLE_Simulator.py port")
+    parser.add_argument('--connect', nargs='?', const=f"{STREAM_HOST}:{STREAM_PORT}", metavar='HOST:PORT',
+                        help=f"attach to a running TURTLE_Daemon.py instead of opening the ports (default {STREAM_HOST}:{STREAM_PORT})")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long each startup step took once the ports are open, then exit")
+    args, qt_args = parser.parse_known_args()
+    daemon_address = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(':')
+        daemon_address = (host or STREAM_HOST, int(port))
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle("Fusion")
-    window = ThermocoupleUI()
+    window = ThermocoupleUI(ports=args.port, daemon_address=daemon_address)
+    window.profile_startup = args.profile_startup
+    mark_startup("window built")
     window.show()
+    QTimer.singleShot(0, lambda: mark_startup("window shown"))
     sys.exit(app.exec())
@@ -0,0 +1,234 @@
+# Batch cooling rate analysis: walks a directory of TURTLE recordings (recording logs, TURTLE_Data
+# exports in .csv/.xlsx/.parquet, and .turtle archives), analyses them on a process pool and
+# writes one report with a row per recording and thermocouple.
+#
+#   python TURTLE_Batch.py "~/Documents/TURTLE Recordings" --interval 0 -100 --interval -100 -150 -o report.xlsx
+#
+# Results are cached by file content in the directory's .turtle_batch_cache.json, so a rerun
+# only analyses recordings that are new or have changed (or all of them with new intervals).
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from TURTLE_Core import RecordingArchive, archive_source, calculate_cooling_rates, find_archive, load_recording
+
+RECORDING_EXTENSIONS = ('.csv', '.xlsx', '.parquet')
+CACHE_FILENAME = '.turtle_batch_cache.json'
+REPORT_FILENAME = 'TURTLE_Batch_Report'
+CACHE_VERSION = 1
+HASH_BLOCK = 1 << 20
+
+def find_recordings(directory, exclude=()):
+    # Every recording under directory, sorted. An archive is only listed on its own when the
+    # file it was built from is gone; otherwise it is used to read that file faster.
+    exclude = {os.path.abspath(path) for path in exclude}
+    recordings = []
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if (name.lower().endswith(RECORDING_EXTENSIONS) and not name.startswith(('~$', REPORT_FILENAME))
+                    and os.path.abspath(path) not in exclude):
+                recordings.append(path)
+        for name in list(dirs):
+            if name.endswith(RecordingArchive.SUFFIX) or name.endswith('.partial'):
+                dirs.remove(name)  # never descend into archives
+                path = os.path.join(root, name)
+                if name.endswith(RecordingArchive.SUFFIX) and not archive_source(path):
+                    recordings.append(path)
+    return sorted(recordings)
+
+def content_digest(path):
+    # SHA-256 of a file, or of an archive directory's file names and contents
+    digest = hashlib.sha256()
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    for filepath in paths:
+        if filepath != path:
+            digest.update(os.path.basename(filepath).encode() + b'\0')
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def file_signature(path):
+    # Cheap change check that lets a rerun skip hashing untouched files
+    if os.path.isdir(path):
+        stats = [os.stat(os.path.join(path, name)) for name in sorted(os.listdir(path))]
+    else:
+        stats = [os.stat(path)]
+    return [sum(stat.st_size for stat in stats), max(stat.st_mtime_ns for stat in stats)]
+
+def open_recording(path):
+    # A log or export is read through its archive when that is up to date, which skips parsing
+    if not os.path.isdir(path):
+        archive = find_archive(path)
+        if archive is not None:
+            try:
+                return RecordingArchive(archive)
+            except (OSError, ValueError):
+                pass
+    return load_recording(path)
+
+def analyse_recording(path, intervals):
+    # {tc_id: statistics and cooling rates} for one recording, or {'error': message}. Runs in
+    # a worker process, so it only takes and returns plain data.
+    try:
+        recording = open_recording(path)
+        rates = calculate_cooling_rates(recording, intervals)
+        channels = {}
+        for tc_id in recording.channels():
+            timestamps, temps = recording.view(tc_id)
+            if not len(temps):
+                continue
+            temps = np.asarray(temps)
+            channels[str(tc_id)] = {
+                'samples': len(temps),
+                'start_s': round(float(timestamps[0]), 3),
+                'end_s': round(float(timestamps[-1]), 3),
+                'min_c': round(float(temps.min()), 3),
+                'max_c': round(float(temps.max()), 3),
+                'mean_c': round(float(temps.mean()), 3),
+                'std_c': round(float(temps.std()), 3),
+                'rates': rates.get(tc_id, [None] * len(intervals)),
+            }
+        if not channels:
+            return {'error': "no thermocouple data"}
+        return {'channels': channels}
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+
+def load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {'version': CACHE_VERSION, 'files': {}, 'results': {}}
+
+def save_cache(path, cache):
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temporary, path)
+
+def analyse_directory(directory, intervals, cache_path, jobs=None, exclude=(), progress=None):
+    # [(path, result)] for every recording under directory, analysing only cache misses
+    recordings = find_recordings(directory, exclude=list(exclude) + [cache_path])
+    cache = load_cache(cache_path)
+    # Results depend on the intervals as well as the content
+    parameters = json.dumps([[float(start), float(end)] for start, end in intervals])
+    files = cache['files']
+    digests = {}
+    unknown = []
+    for path in recordings:
+        key = os.path.relpath(path, directory)
+        entry = files.get(key)
+        if entry is not None and entry[:2] == file_signature(path):
+            digests[path] = entry[2]
+        else:
+            unknown.append(path)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for path, digest in zip(unknown, pool.map(content_digest, unknown)):
+            digests[path] = digest
+            files[os.path.relpath(path, directory)] = file_signature(path) + [digest]
+        results = cache['results']
+        missing = [path for path in recordings if f"{digests[path]}:{parameters}" not in results]
+        futures = {pool.submit(analyse_recording, path, intervals): path for path in missing}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            results[f"{digests[path]}:{parameters}"] = future.result()
+            if progress:
+                progress(done, len(missing), path)
+
+    # Forget files that are gone and results for content no file has any more
+    keys = {os.path.relpath(path, directory) for path in recordings}
+    cache['files'] = {key: entry for key, entry in files.items() if key in keys}
+    current = {entry[2] for entry in cache['files'].values()}
+    cache['results'] = {key: result for key, result in results.items() if key.split(':', 1)[0] in current}
+    save_cache(cache_path, cache)
+    return [(path, cache['results'][f"{digests[path]}:{parameters}"]) for path in recordings], len(missing)
+
+def report_rows(results, directory, intervals):
+    rows = []
+    for path, result in results:
+        name = os.path.relpath(path, directory)
+        if 'error' in result:
+            rows.append({'Recording': name, 'Error': result['error']})
+            continue
+        for tc_id, channel in sorted(result['channels'].items(), key=lambda item: int(item[0])):
+            row = {
+                'Recording': name,
+                'Thermocouple': int(tc_id),
+                'Samples': channel['samples'],
+                'Start (s)': channel['start_s'],
+                'End (s)': channel['end_s'],
+                'Min (°C)': channel['min_c'],
+                'Max (°C)': channel['max_c'],
+                'Mean (°C)': channel['mean_c'],
+                'Std (°C)': channel['std_c'],
+            }
+            for (start, end), rate in zip(intervals, channel['rates']):
+                label = f"{start:g} to {end:g} °C"
+                row[f"Cooling Rate {label} (°C/min)"] = rate['cooling_rate'] if rate else None
+                row[f"Time {label} (s)"] = round(rate['interval2_time'] - rate['interval1_time'], 2) if rate else None
+            rows.append(row)
+    return rows
+
+def write_report(path, rows):
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    for column in ('Thermocouple', 'Samples'):
+        if column in df.columns:
+            df[column] = df[column].astype('Int64')  # stay integers next to error rows
+    if 'Error' in df.columns:
+        df = df[[column for column in df.columns if column != 'Error'] + ['Error']]
+    if path.lower().endswith('.xlsx'):
+        df.to_excel(path, index=False, sheet_name='Batch Analysis')
+    else:
+        df.to_csv(path, index=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cooling rates and statistics for a directory of TURTLE recordings.")
+    parser.add_argument('directory', help="directory searched recursively for recordings")
+    parser.add_argument('--interval', nargs=2, type=float, action='append', default=[], metavar=('START', 'END'),
+                        help="temperatures (°C) to measure the cooling rate between (repeatable)")
+    parser.add_argument('-o', '--output', default=f"{REPORT_FILENAME}.csv",
+                        help=f"report file, .csv or .xlsx (default {REPORT_FILENAME}.csv in the directory)")
+    parser.add_argument('-j', '--jobs', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--cache', help=f"cache file (default {CACHE_FILENAME} in the directory)")
+    parser.add_argument('--no-cache', action='store_true', help="analyse everything again")
+    args = parser.parse_args(argv)
+
+    directory = os.path.expanduser(args.directory)
+    if not os.path.isdir(directory):
+        parser.error(f"{directory} is not a directory")
+    output = args.output if os.path.dirname(args.output) else os.path.join(directory, args.output)
+    cache_path = args.cache or os.path.join(directory, CACHE_FILENAME)
+    if args.no_cache and os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    def progress(done, total, path):
+        print(f"[{done}/{total}] {os.path.relpath(path, directory)}", file=sys.stderr)
+
+    results, analysed = analyse_directory(directory, args.interval, cache_path, jobs=args.jobs, exclude=[output],
+                                          progress=progress)
+    write_report(output, report_rows(results, directory, args.interval))
+    errors = sum('error' in result for _, result in results)
+    print(f"{len(results)} recording(s), {analysed} analysed, {len(results) - analysed} from cache, {errors} failed",
+          file=sys.stderr)
+    print(f"Report written to {output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,460 @@
+# Benchmarks for the paths that scale with recording length: parsing and decoding the serial
+# stream, the reader-to-recording pipeline, the in-memory store, cooling rate analysis, graph
+# decimation, the recording log and the export writers. Every stage runs headlessly on synthetic
+# STATUS streams and recordings, and reports throughput, per-call latency and peak memory.
+#
+#   python TURTLE_Bench.py                                   # 10^5 and 10^6 frames, every stage
+#   python TURTLE_Bench.py --frames 1e7 --stages parse,decode,store,cooling,decimate
+#   python TURTLE_Bench.py --save-baseline                   # on the release machine, once
+#   python TURTLE_Bench.py                                   # later: exits 1 on a regression
+#
+# Baselines are only comparable on the machine they were recorded on, so the baseline file
+# records the machine and a mismatch is reported next to the comparison.
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import binascii
+import tempfile
+import tracemalloc
+from itertools import cycle, islice
+from time import perf_counter, perf_counter_ns
+
+import numpy as np
+
+from TURTLE_Core import (
+    AcquisitionCore, BinaryFrameDecoder, Frame, RecordingLog, SampleStore, EXPORT_WRITERS, FRAME_HEADER, FRAME_SYNC,
+    calculate_cooling_rates, load_recording, minmax_decimate, parse_status_line
+)
+from TURTLE_Graph import GRAPH_BUCKETS
+
+BASELINE_FILENAME = 'TURTLE_Bench_Baseline.json'
+BASELINE_VERSION = 1
+DEFAULT_FRAMES = (100000, 1000000)
+DEFAULT_TOLERANCE = 0.25
+# Peak memory growth below this is noise, whatever the relative change
+MEMORY_FLOOR_MB = 1.0
+
+# Synthetic session: one frame per SAMPLE_INTERVAL, every channel cooling exponentially from room
+# temperature into liquid nitrogen, each a little later than the one before
+SAMPLE_INTERVAL = 0.1
+START_TEMP = 22.0
+BATH_TEMP = -196.0
+CHANNEL_LAG = 2.0
+NOISE = 0.05
+INTERVALS = [(0.0, -100.0), (-100.0, -150.0)]
+
+# Distinct STATUS lines and binary frames replayed by the stream stages, and the bytes handed to
+# the decoder per read (about one USB packet)
+STREAM_POOL = 4096
+READ_SIZE = 64
+
+def synthetic_temps(frames, channels, seed=0):
+    # (timestamps, [temps per channel]) of a cooldown that crosses every INTERVALS level
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(frames) * SAMPLE_INTERVAL
+    time_constant = frames * SAMPLE_INTERVAL / 8
+    temps = []
+    for channel in range(channels):
+        elapsed = np.maximum(timestamps - frames * SAMPLE_INTERVAL / 10 - CHANNEL_LAG * channel, 0.0)
+        curve = BATH_TEMP + (START_TEMP - BATH_TEMP) * np.exp(-elapsed / time_constant)
+        temps.append(curve + rng.normal(0.0, NOISE, frames))
+    return timestamps, temps
+
+def synthetic_recording(frames, channels):
+    samples = SampleStore()
+    timestamps, temps = synthetic_temps(frames, channels)
+    for channel, column in enumerate(temps):
+        samples.extend(channel + 1, timestamps, column)
+    return samples
+
+def status_lines(channels):
+    # A pool of STATUS lines as the text firmware sends them, with an occasional open thermocouple
+    rng = random.Random(0)
+    lines = []
+    for _ in range(STREAM_POOL):
+        fields = "".join(
+            f"T{i+1}:Not Connected," if rng.random() < 0.01 else f"T{i+1}:{rng.uniform(-196, 22):.2f},"
+            for i in range(channels)
+        )
+        lines.append(f"STATUS:{fields};\r\n".encode())
+    return lines
+
+def binary_stream(frames, channels):
+    # frames binary frames back to back, as TURTLE_ArduinoV3.ino sends them every SAMPLE_INTERVAL.
+    # Built column-wise, CRCs included, so 10^7 frames take seconds rather than minutes.
+    layout = np.dtype([('sync', 'u1', len(FRAME_SYNC)), ('seq', '<u2'), ('device_ms', '<u4'), ('faults', 'u1'),
+                       ('count', 'u1'), ('temps', '<f4', (channels,)), ('crc', '<u2')])
+    assert layout.itemsize == len(FRAME_SYNC) + FRAME_HEADER.size + 4 * channels + 2
+    data = np.zeros(frames, dtype=layout)
+    data['sync'] = np.frombuffer(FRAME_SYNC, dtype=np.uint8)
+    data['seq'] = np.arange(frames) & 0xFFFF
+    data['device_ms'] = np.arange(frames) * int(SAMPLE_INTERVAL * 1000)
+    data['count'] = channels
+    data['temps'] = np.random.default_rng(0).uniform(BATH_TEMP, START_TEMP, (frames, channels))
+    # CRC-16/CCITT-FALSE over everything between the sync bytes and the CRC, one byte column at a time
+    table = np.array([binascii.crc_hqx(bytes([byte]), 0) for byte in range(256)], dtype=np.uint16)
+    body = data.view(np.uint8).reshape(frames, layout.itemsize)[:, len(FRAME_SYNC):-2]
+    crc = np.full(frames, 0xFFFF, dtype=np.uint16)
+    for column in body.T:
+        crc = (crc << 8) ^ table[(crc >> 8) ^ column]
+    data['crc'] = crc
+    return data.tobytes()
+
+def call_each(function, items, latencies):
+    # Calls function on every item, timing each call into latencies (an int64 array) if given
+    if latencies is None:
+        for item in items:
+            function(item)
+        return
+    clock = perf_counter_ns
+    for i, item in enumerate(items):
+        start = clock()
+        function(item)
+        latencies[i] = clock() - start
+
+class BenchPort:
+    # Stands in for serial.Serial, replaying a binary stream as fast as the reader takes it.
+    # While the frame queue is more than half full it holds back like a real port at full rate
+    # would, so the pipeline is measured rather than its drop-oldest overflow handling.
+    def __init__(self, stream, queue):
+        self.port = 'bench'
+        self.baudrate = None
+        self._stream = memoryview(stream)
+        self._offset = 0
+        self._queue = queue
+
+    @property
+    def in_waiting(self):
+        return min(len(self._stream) - self._offset, READ_SIZE)
+
+    def read(self, size=1):
+        if self._offset == len(self._stream):
+            time.sleep(0.05)  # read timeout
+            return b''
+        while self._queue.qsize() > self._queue.maxsize // 2:
+            time.sleep(0.001)
+        data = bytes(self._stream[self._offset:self._offset + size])
+        self._offset += len(data)
+        return data
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class Progress:
+    # The job argument of an export writer, without the thread or process around it
+    def report(self, fraction):
+        pass
+
+# Each stage is (prepare, run, unit). prepare(frames, channels, workdir) builds the input outside
+# the timed region; run(state, latencies) processes it and returns how many units it handled,
+# or (units, seconds) when it has to time itself to leave out its own setup and teardown.
+# Streaming stages time every call into latencies when it is given, pipeline fills it with the
+# core's latency histogram, and the others are timed as one call each.
+
+def prepare_parse(frames, channels, workdir):
+    return frames, status_lines(channels)
+
+def run_parse(state, latencies):
+    frames, lines = state
+    call_each(parse_status_line, islice(cycle(lines), frames), latencies)
+    return frames
+
+def prepare_decode(frames, channels, workdir):
+    stream = binary_stream(STREAM_POOL, channels)
+    chunks = [stream[i:i + READ_SIZE] for i in range(0, len(stream), READ_SIZE)]
+    return frames * len(stream) // STREAM_POOL // READ_SIZE, chunks
+
+def run_decode(state, latencies):
+    reads, chunks = state
+    decoder = BinaryFrameDecoder()
+    call_each(decoder.feed, islice(cycle(chunks), reads), latencies)
+    return reads * READ_SIZE
+
+def prepare_pipeline(frames, channels, workdir):
+    return frames, binary_stream(frames, channels), workdir
+
+def run_pipeline(state, latencies):
+    # Reader thread, consumer thread, SampleStore, RecordingLog and archive, as during a
+    # recording; latencies are the core's own reader-to-recording histogram (ms)
+    frames, stream, workdir = state
+    core = AcquisitionCore(binary=True, recordings_dir=tempfile.mkdtemp(dir=workdir))
+    port = BenchPort(stream, core.acquisition.frames)
+    core.acquisition.add_device(port, binary=True)
+    core.serial_ports.append(port)
+    core.connected = True
+    core.start_recording()
+    start = perf_counter()
+    core.start()
+    while core.stats.frames.get(0, 0) < frames:
+        time.sleep(0.001)
+    elapsed = perf_counter() - start
+    core.close()
+    if latencies is not None:
+        latencies.update(core.stats.consumer_latency.snapshot())
+    return frames, elapsed
+
+def prepare_store(frames, channels, workdir):
+    timestamps, temps = synthetic_temps(frames, channels)
+    rows = np.column_stack([timestamps] + temps).tolist()
+    return rows
+
+def run_store(rows, latencies):
+    samples = SampleStore()
+    append = samples.append
+    def store(row):
+        for index in range(1, len(row)):
+            append(index, row[0], row[index])
+    call_each(store, rows, latencies)
+    return len(rows)
+
+def prepare_cooling(frames, channels, workdir):
+    return synthetic_recording(frames, channels)
+
+def run_cooling(samples, latencies):
+    calculate_cooling_rates(samples, INTERVALS)
+    return len(samples)
+
+def run_decimate(samples, latencies):
+    for tc_id in samples.channels():
+        minmax_decimate(*samples.view(tc_id), -np.inf, np.inf, GRAPH_BUCKETS)
+    return len(samples)
+
+def prepare_log_write(frames, channels, workdir):
+    timestamps, temps = synthetic_temps(frames, channels)
+    rows = np.column_stack([timestamps] + temps).tolist()
+    return [(row[0], Frame(0.0, 0, list(enumerate(row[1:])))) for row in rows], workdir
+
+def run_log_write(state, latencies):
+    rows, workdir = state
+    path = os.path.join(workdir, 'log_write.csv')
+    if os.path.exists(path):
+        os.remove(path)  # left by the previous repeat; RecordingLog never overwrites
+    log = RecordingLog(path, channels=len(rows[0][1].readings))
+    try:
+        call_each(lambda row: log.write(*row), rows, latencies)
+    finally:
+        log.close()
+    return len(rows)
+
+def prepare_log_read(frames, channels, workdir):
+    path = os.path.join(workdir, 'log_read.csv')
+    timestamps, temps = synthetic_temps(frames, channels)
+    log = RecordingLog(path, channels=channels)
+    for row in np.column_stack([timestamps] + temps).tolist():
+        log.write(row[0], Frame(0.0, 0, list(enumerate(row[1:]))))
+    log.close()
+    return path
+
+def run_log_read(path, latencies):
+    return len(load_recording(path))
+
+def export_stage(extension):
+    def prepare(frames, channels, workdir):
+        samples = synthetic_recording(frames, channels)
+        rates = {tc_id: results[0] for tc_id, results in calculate_cooling_rates(samples, INTERVALS).items()}
+        series = {tc_id: samples.view(tc_id) for tc_id in samples.channels()}
+        return series, rates, os.path.join(workdir, f'export{extension}')
+
+    def run(state, latencies):
+        series, rates, path = state
+        EXPORT_WRITERS[extension](Progress(), path, series, 'C', rates)
+        return sum(len(timestamps) for timestamps, _ in series.values())
+    return prepare, run
+
+STAGES = {
+    'parse': (prepare_parse, run_parse, 'lines'),
+    'decode': (prepare_decode, run_decode, 'bytes'),
+    'pipeline': (prepare_pipeline, run_pipeline, 'frames'),
+    'store': (prepare_store, run_store, 'frames'),
+    'cooling': (prepare_cooling, run_cooling, 'samples'),
+    'decimate': (prepare_cooling, run_decimate, 'samples'),
+    'log_write': (prepare_log_write, run_log_write, 'frames'),
+    'log_read': (prepare_log_read, run_log_read, 'samples'),
+    'export_csv': export_stage('.csv') + ('samples',),
+    'export_xlsx': export_stage('.xlsx') + ('samples',),
+    'export_parquet': export_stage('.parquet') + ('samples',),
+}
+# Streaming stages, timed per call; pipeline reports the core's latency histogram instead
+PER_CALL_STAGES = ('parse', 'decode', 'store', 'log_write')
+# Modules a stage needs beyond numpy
+STAGE_MODULES = {'log_read': 'pandas', 'export_csv': 'pandas', 'export_xlsx': 'xlsxwriter', 'export_parquet': 'pyarrow'}
+
+def percentiles_ms(values_ns):
+    values = np.asarray(values_ns, dtype=np.float64) / 1e6
+    p50, p99, p999 = np.percentile(values, [50, 99, 99.9])
+    return {'p50': round(p50, 4), 'p99': round(p99, 4), 'p99.9': round(p999, 4), 'max': round(values.max(), 4)}
+
+def run_stage(name, frames, channels, repeat, workdir, measure_memory=True):
+    prepare, run, unit = STAGES[name]
+    state = prepare(frames, channels, workdir)
+
+    # Throughput from uninstrumented runs; the pipeline's latency histogram is always on
+    durations = []
+    histogram = {} if name == 'pipeline' else None
+    for _ in range(repeat):
+        start = perf_counter_ns()
+        units = run(state, histogram)
+        duration = perf_counter_ns() - start
+        if isinstance(units, tuple):
+            units, seconds = units
+            duration = int(seconds * 1e9)
+        durations.append(duration)
+    best = min(durations) / 1e9
+    result = {
+        'stage': name,
+        'frames': frames,
+        'unit': unit,
+        'units': units,
+        'best_s': round(best, 4),
+        'median_s': round(float(np.median(durations)) / 1e9, 4),
+        'throughput': round(units / best, 1),
+    }
+
+    # Latency per call from one instrumented run, or per run for the batch stages
+    if name in PER_CALL_STAGES:
+        latencies = np.zeros(units if name != 'decode' else units // READ_SIZE, dtype=np.int64)
+        run(state, latencies)
+        result['latency_ms'] = percentiles_ms(latencies)
+    elif name == 'pipeline':
+        # Reader to recording, queueing included: at full speed the queue stays half full
+        result['latency_ms'] = {key: histogram[key] for key in ('p50', 'p99', 'max')}
+    else:
+        result['latency_ms'] = percentiles_ms(durations)
+
+    # Peak of Python and numpy allocations during one more run
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            run(state, None)
+            result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        finally:
+            tracemalloc.stop()
+    return result
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.processor(),
+            'cpus': os.cpu_count(), 'numpy': np.__version__}
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('version') == BASELINE_VERSION:
+            return baseline
+    except (OSError, ValueError):
+        pass
+    return None
+
+def save_baseline(path, results, previous=None):
+    # Results are merged into an existing baseline, so stages and sizes can be recorded separately
+    entries = dict(previous['results']) if previous and previous.get('machine') == machine_info() else {}
+    for result in results:
+        entries[f"{result['stage']}:{result['frames']}"] = {
+            'throughput': result['throughput'],
+            'peak_mb': result.get('peak_mb'),
+        }
+    baseline = {'version': BASELINE_VERSION, 'machine': machine_info(), 'results': entries}
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+    os.replace(temporary, path)
+
+def compare(result, baseline, tolerance):
+    # Regression messages for one result: throughput down or peak memory up by more than tolerance
+    reference = baseline['results'].get(f"{result['stage']}:{result['frames']}") if baseline else None
+    if reference is None:
+        return None, []
+    regressions = []
+    change = result['throughput'] / reference['throughput'] - 1
+    if change < -tolerance:
+        regressions.append(f"throughput {change:+.0%}")
+    if result.get('peak_mb') is not None and reference.get('peak_mb'):
+        memory_change = result['peak_mb'] / reference['peak_mb'] - 1
+        if memory_change > tolerance and result['peak_mb'] - reference['peak_mb'] > MEMORY_FLOOR_MB:
+            regressions.append(f"peak memory {memory_change:+.0%}")
+    return change, regressions
+
+def format_row(result, change, regressions):
+    latency = result['latency_ms']
+    peak = result.get('peak_mb')
+    verdict = "" if change is None else f"{change:+.0%}" + (" REGRESSION: " + ", ".join(regressions) if regressions else "")
+    return (f"{result['stage']:<15}{result['frames']:>10}  {result['throughput']:>12.4g} {result['unit'] + '/s':<10}"
+            f"{result['best_s']:>9.3f} {latency['p50']:>10.4g} {latency['p99']:>10.4g} {latency['max']:>10.4g}"
+            f" {'-' if peak is None else f'{peak:.1f}':>9}  {verdict}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the TURTLE hot paths on synthetic data.")
+    parser.add_argument('--frames', type=float, nargs='+', default=list(DEFAULT_FRAMES),
+                        help="session lengths in frames (one reading per channel each), e.g. 1e5 1e6 1e7")
+    parser.add_argument('--channels', type=int, default=2, help="thermocouples per frame (default 2)")
+    parser.add_argument('--stages', help=f"comma-separated stages to run (default all): {', '.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage; the best one counts (default 3)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the extra traced run that measures peak memory")
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), BASELINE_FILENAME),
+                        help=f"baseline file to compare with (default {BASELINE_FILENAME} next to this script)")
+    parser.add_argument('--save-baseline', action='store_true', help="record these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown or memory growth before a result is a regression (default {DEFAULT_TOLERANCE})")
+    parser.add_argument('--json', metavar='PATH', help="also write the full results as JSON")
+    args = parser.parse_args(argv)
+
+    stages = args.stages.split(',') if args.stages else list(STAGES)
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    baseline = load_baseline(args.baseline)
+    if baseline and not args.save_baseline and baseline.get('machine') != machine_info():
+        print(f"Warning: the baseline was recorded on another machine or Python ({baseline.get('machine')})",
+              file=sys.stderr)
+
+    print(f"{'stage':<15}{'frames':>10}  {'throughput':>12} {'':<10}{'best s':>9} {'p50 ms':>10} {'p99 ms':>10}"
+          f" {'max ms':>10} {'peak MB':>9}  vs baseline")
+    results = []
+    regressed = False
+    workdir = tempfile.mkdtemp(prefix='turtle_bench_')
+    try:
+        for frames in (int(frames) for frames in args.frames):
+            for name in stages:
+                module = STAGE_MODULES.get(name)
+                if module:
+                    try:
+                        __import__(module)
+                    except ImportError:
+                        print(f"{name:<15}{frames:>10}  skipped, needs {module}")
+                        continue
+                result = run_stage(name, frames, args.channels, args.repeat, workdir, not args.no_memory)
+                change, regressions = compare(result, None if args.save_baseline else baseline, args.tolerance)
+                regressed = regressed or bool(regressions)
+                result['regressions'] = regressions
+                results.append(result)
+                print(format_row(result, change, regressions), flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine_info(), 'channels': args.channels, 'results': results}, f, indent=2)
+    if args.save_baseline:
+        save_baseline(args.baseline, results, baseline)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline", file=sys.stderr)
+    elif regressed:
+        print(f"Performance regressions beyond {args.tolerance:.0%} of the baseline", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2504 @@
+# Qt-free TURTLE core: serial acquisition, recording, cooling rate analysis and export, plus a
+# local TCP stream so any number of clients (the desktop app, TURTLE_Daemon.py consumers,
+# scripts) can follow one acquisition live.
+
+import os
+import re
+import sys
+import json
+import shutil
+import struct
+import socket
+import binascii
+from time import time as current_time, perf_counter
+from datetime import datetime
+
+import numpy as np
+# pandas and xlsxwriter are imported where they are used: together they take longer to load
+# than the rest of the app, and only export and reloading a recording need them
+
+import serial
+from serial.tools import list_ports
+from threading import Thread, Event, Lock, RLock
+from queue import Queue, Empty, Full
+from bisect import bisect_right
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# One parsed frame. readings is a list of (tc_index, temp_c) where temp_c is None for a
+# channel reporting "Not Connected"; received_at is time.perf_counter() at arrival and device
+# is the index of the port it came from. Binary frames also carry the device sequence number
+# and millis() timestamp; sampled_at is when the box took the readings on the perf_counter()
+# timeline (see DeviceClock), and elapsed is the recording timestamp once the frame is recorded.
+# replayed marks pre-trigger frames published again when the recording they start begins.
+Frame = namedtuple('Frame', ['received_at', 'device', 'readings', 'seq', 'device_ms', 'elapsed', 'sampled_at', 'replayed'],
+                   defaults=(None, None, None, None, False))
+
+# Binary protocol (see TURTLE_ArduinoV3.ino): sync bytes, then little-endian seq (uint16),
+# device millis (uint32), open-thermocouple fault bits (uint8), channel count (uint8),
+# float32 temperatures and a CRC-16/CCITT-FALSE over everything after the sync bytes
+USE_BINARY_PROTOCOL = True
+ASCII_BAUD = 9600
+BINARY_BAUD = 115200
+FRAME_SYNC = b'\xaa\x55'
+FRAME_HEADER = struct.Struct('<HIBB')
+FRAME_MAX_CHANNELS = 8
+
+# USB IDs of the Arduino boards and USB-serial chips TURTLE boxes ship with
+ARDUINO_VID_PIDS = ("VID:PID=2341:0043", "VID:PID=0403:6001", "VID:PID=2A03:0010", "VID:PID=1A86:7523")
+
+# Recordings are streamed here as they happen; the in-memory copy is capped per channel
+RECORDINGS_DIR = os.path.join(os.path.expanduser('~'), 'Documents', 'TURTLE Recordings')
+MAX_SAMPLES_IN_MEMORY = 1 << 20
+
+# Histogram bucket upper bounds for latencies (ms) and the serial input backlog (bytes)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+BACKLOG_BUCKETS = (0, 16, 64, 256, 1024, 4096, 16384)
+
+# Local TCP port of the acquisition stream (TURTLE_Daemon.py, ThermocoupleUI --connect)
+STREAM_HOST = '127.0.0.1'
+STREAM_PORT = 50507
+# Box commands stream clients may send; PROTO: and the like would pull a box out from under the core
+STREAM_SEND_COMMANDS = ('RATE:', 'RATEMS:', 'TYPE:', 'AVG:')
+
+def parse_status_line(raw):
+    try:
+        line = raw.decode('utf-8').strip()
+        if "STATUS:" not in line:
+            return None
+        _, statuses = line.split("STATUS:")
+        readings = []
+        for data in statuses.split(",")[:-1]:
+            tc, status = data.split(":")
+            index = int(tc[1]) - 1
+            readings.append((index, None if status == "Not Connected" else float(status)))
+        return readings
+    except (UnicodeDecodeError, ValueError, IndexError):
+        return None
+
+def rate_command(seconds):
+    # Whole seconds go out as RATE:, which every firmware understands; sub-second intervals need
+    # the millisecond RATEMS: command. 0 asks for one frame per thermocouple conversion.
+    milliseconds = int(round(seconds * 1000))
+    if milliseconds % 1000 == 0:
+        return f"RATE:{milliseconds // 1000};"
+    return f"RATEMS:{milliseconds};"
+
+def command_interval(message):
+    # Seconds between frames a RATE:/RATEMS: command asks for (see rate_command)
+    try:
+        if message.startswith("RATEMS:"):
+            seconds = int(message[7:].rstrip(";")) / 1000
+        else:
+            seconds = int(message[5:].rstrip(";"))
+    except ValueError:
+        return None
+    return seconds if seconds > 0 else 0.1  # RATE:0 is one frame per conversion
+
+def put_dropping_oldest(queue, item):
+    # Put without blocking, discarding the oldest entries of a full queue. Safe with several
+    # producers on one queue. Returns how many entries were discarded.
+    dropped = 0
+    while True:
+        try:
+            queue.put_nowait(item)
+            return dropped
+        except Full:
+            try:
+                queue.get_nowait()
+                dropped += 1
+            except Empty:
+                pass
+
+class BinaryFrameDecoder:
+    # Reassembles binary frames from arbitrary chunks of bytes, resynchronising on the sync
+    # bytes after noise or a CRC failure
+    def __init__(self):
+        self.buffer = bytearray()
+        self.crc_errors = 0
+
+    def feed(self, data):
+        self.buffer += data
+        decoded = []
+        while True:
+            start = self.buffer.find(FRAME_SYNC)
+            if start < 0:
+                del self.buffer[:-1]  # the last byte may be the first half of a sync
+                break
+            del self.buffer[:start]
+            if len(self.buffer) < len(FRAME_SYNC) + FRAME_HEADER.size:
+                break
+            seq, device_ms, faults, count = FRAME_HEADER.unpack_from(self.buffer, len(FRAME_SYNC))
+            if count > FRAME_MAX_CHANNELS:
+                del self.buffer[:1]
+                continue
+            payload_end = len(FRAME_SYNC) + FRAME_HEADER.size + 4 * count
+            if len(self.buffer) < payload_end + 2:
+                break
+            crc, = struct.unpack_from('<H', self.buffer, payload_end)
+            if binascii.crc_hqx(bytes(self.buffer[len(FRAME_SYNC):payload_end]), 0xFFFF) != crc:
+                self.crc_errors += 1
+                del self.buffer[:1]
+                continue
+            temps = struct.unpack_from(f'<{count}f', self.buffer, len(FRAME_SYNC) + FRAME_HEADER.size)
+            readings = [(i, None if faults >> i & 1 else temp) for i, temp in enumerate(temps)]
+            decoded.append((seq, device_ms, readings))
+            del self.buffer[:payload_end + 2]
+        return decoded
+
+def negotiate_binary_protocol(ser, boot_timeout=4.0, reply_timeout=1.0):
+    # Opening the port resets most boards, so wait for the sketch's first STATUS line, offer the
+    # binary protocol and switch baud rate on acknowledgement. Firmware without binary support
+    # ignores the command and the port stays on the ASCII protocol.
+    deadline = perf_counter() + boot_timeout
+    offered = False
+    while perf_counter() < deadline:
+        line = ser.readline()
+        if not offered and b"STATUS:" in line:
+            ser.write(b"PROTO:BIN;")
+            offered = True
+            deadline = perf_counter() + reply_timeout
+        elif b"PROTO:BIN:OK" in line:
+            ser.baudrate = BINARY_BAUD
+            ser.reset_input_buffer()
+            return True
+    return False
+
+class DeviceClock:
+    # Maps a box's millis() timestamps onto the host perf_counter() timeline, so sample times
+    # keep the board's own spacing instead of USB and scheduler jitter, and never follow wall
+    # clock changes. Transfer delays only ever make a frame late, so the offset follows the
+    # earliest arrivals (the lower envelope of arrival - device time), and the slope of a
+    # least-squares fit over the last WINDOW frames tracks the board oscillator's drift. When
+    # the envelope drops or a refit moves the line, mapped times are held at the last one rather
+    # than stepping back, since everything downstream expects each channel's timestamps sorted.
+    WINDOW = 256
+    REFIT_EVERY = 16
+    MIN_FIT_SPAN = 10.0  # device seconds before the drift estimate is trusted
+    MAX_DRIFT = 0.01     # ceramic resonators are specified to ±0.5%
+
+    def __init__(self):
+        self.resets = 0
+        self._last_mapped = -np.inf  # kept across board restarts too
+        self.reset()
+
+    def reset(self):
+        self.rate = 1.0  # host seconds per device second
+        self.offset = None
+        self._points = deque(maxlen=self.WINDOW)
+        self._last_ms = None
+        self._wraps = 0
+        self._since_fit = 0
+
+    @property
+    def drift_ppm(self):
+        return (self.rate - 1.0) * 1e6
+
+    def map(self, device_ms, received_at):
+        if self._last_ms is not None and device_ms < self._last_ms:
+            if self._last_ms - device_ms > 1 << 31:
+                self._wraps += 1  # millis() rolls over every 49.7 days
+            else:
+                self.reset()  # the board restarted
+                self.resets += 1
+        self._last_ms = device_ms
+        device_time = (self._wraps * (1 << 32) + device_ms) / 1000
+        self._points.append((device_time, received_at))
+
+        # Counted rather than taken from len(self._points), which stops growing once the window is full
+        self._since_fit += 1
+        if self.offset is None or self._since_fit >= self.REFIT_EVERY:
+            self._since_fit = 0
+            self._fit()
+        else:
+            self.offset = min(self.offset, received_at - self.rate * device_time)
+        self._last_mapped = max(self.offset + self.rate * device_time, self._last_mapped)
+        return self._last_mapped
+
+    def _fit(self):
+        points = np.array(self._points)
+        device_times, arrivals = points[:, 0], points[:, 1]
+        span = device_times[-1] - device_times[0]
+        if span >= self.MIN_FIT_SPAN:
+            # Least-squares slope in closed form; np.polyfit costs ten times as much for the same line
+            x = device_times - device_times.mean()
+            slope = np.dot(x, arrivals - arrivals.mean()) / np.dot(x, x)
+            self.rate = min(max(slope, 1.0 - self.MAX_DRIFT), 1.0 + self.MAX_DRIFT)
+        self.offset = float(np.min(arrivals - self.rate * device_times))
+
+class RateMeter:
+    # Achieved frame rate of each device over the last WINDOW seconds, so the app can show what
+    # the hardware actually delivered rather than what was asked for. Devices with no frame for
+    # two windows are left out.
+    WINDOW = 5.0
+
+    def __init__(self):
+        self._times = {}
+        self._rates = {}
+
+    def tick(self, device, timestamp):
+        times = self._times.setdefault(device, deque())
+        times.append(timestamp)
+        while times[-1] - times[0] > self.WINDOW:
+            times.popleft()
+        span = times[-1] - times[0]
+        rate = (len(times) - 1) / span if span > 0 else 0.0
+        self._rates[device] = (rate, timestamp)
+
+    def rates(self, now):
+        return {
+            device: rate for device, (rate, last) in sorted(self._rates.copy().items())
+            if now - last <= 2 * self.WINDOW
+        }
+
+class Histogram:
+    # Fixed-bucket histogram, cheap enough to leave on in the per-frame path: one bisect and a
+    # few additions per value. Quantiles are reported as the upper bound of their bucket, capped
+    # at the largest value seen.
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_right(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        remaining = q * self.count
+        for bound, count in zip(self.bounds, self.counts):
+            remaining -= count
+            if remaining <= 0:
+                return min(bound, round(self.max, 3))
+        return round(self.max, 3)
+
+    def snapshot(self):
+        buckets = {f"<={bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets['more'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'max': round(self.max, 3),
+            'buckets': buckets,
+        }
+
+class AcquisitionStats:
+    # Frame counts, time gaps and latencies seen by the consumer (and, for display latency, the
+    # GUI). Each field has a single writer thread, so updates need no locking.
+    GAP_FACTOR = 2.0  # an interval this many times the recent average counts as a gap
+
+    def __init__(self):
+        self.frames = {}
+        self.gaps = {}
+        self.consumer_latency = Histogram(LATENCY_BUCKETS_MS)
+        self.display_latency = Histogram(LATENCY_BUCKETS_MS)
+        self.exports = []
+        self._last_sample = {}
+        self._interval = {}
+        # (perf_counter() time, commanded interval) of the last RATE: change, set by the
+        # sending thread as one tuple and read by the consumer
+        self._rate_change = (-np.inf, None)
+
+    def rate_changed(self, interval):
+        self._rate_change = (perf_counter(), interval)
+
+    def link_restored(self, device):
+        # A reconnected box starts a new series of intervals; the outage is counted as a
+        # disconnect, not a gap, and must not skew the average interval
+        self._last_sample.pop(device, None)
+
+    def frame_consumed(self, device, sampled_at, latency_ms=None):
+        self.frames[device] = self.frames.get(device, 0) + 1
+        if latency_ms is not None:
+            self.consumer_latency.add(latency_ms)
+        last = self._last_sample.get(device)
+        self._last_sample[device] = sampled_at
+        if last is None:
+            return
+        interval = sampled_at - last
+        changed_at, commanded = self._rate_change
+        if last < changed_at:
+            # The interval spans a RATE: change, so it is no gap, and the moving average would
+            # take many frames to reach the new rate: start it from the commanded interval
+            if commanded is None:
+                self._interval.pop(device, None)
+            else:
+                self._interval[device] = commanded
+            return
+        average = self._interval.get(device)
+        if average is not None and interval > self.GAP_FACTOR * average:
+            self.gaps[device] = self.gaps.get(device, 0) + 1
+        # Slow moving average, so jitter does not move the gap threshold
+        self._interval[device] = interval if average is None else average + 0.1 * (interval - average)
+
+    def export_finished(self, path, seconds):
+        self.exports.append({'path': path, 'seconds': round(seconds, 3)})
+
+def metrics_summary(metrics):
+    # One line for a status bar
+    devices = metrics['devices']
+    def total(key):
+        return sum(device.get(key, 0) for device in devices)
+    rates = ", ".join(f"{device['rate_hz']:.1f}" for device in devices) or "-"
+    backlog = max((device['backlog_bytes']['max'] for device in devices if 'backlog_bytes' in device), default=0)
+    latency = metrics['display_latency_ms']['p99']
+    return (f"{rates} Hz | lost {total('lost_frames') + total('dropped_frames')} | malformed {total('malformed')}"
+            f" | gaps {total('gaps')} | disconnects {total('disconnects')} | backlog {backlog:.0f} B | latency p99 {'-' if latency is None else f'{latency:.0f}'} ms")
+
+def write_metrics(path, metrics):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+
+def metrics_path(recording_path):
+    return os.path.splitext(recording_path)[0] + ".metrics.json"
+
+# Port monitor (see AcquisitionCore._monitor): how often the ports are checked, how long a port
+# may stay silent before it counts as lost (at least STALE_TIMEOUT seconds, and STALE_INTERVALS
+# sample intervals), and the first and longest wait between reconnect attempts
+MONITOR_INTERVAL = 0.5
+STALE_TIMEOUT = 5.0
+STALE_INTERVALS = 5
+RECONNECT_BACKOFF = (0.5, 10.0)
+
+class AcquisitionEngine:
+    # Reads complete frames from the serial port on a worker thread and hands them to consumers
+    # through a bounded queue. Reads block in the OS until data or the port timeout arrives, so
+    # the thread sleeps between frames instead of polling in_waiting.
+    def __init__(self, ser, device=0, frames=None, max_frames=1024, binary=False):
+        self.ser = ser
+        self.device = device
+        self.binary = binary
+        self.frames = frames if frames is not None else Queue(maxsize=max_frames)
+        self.dropped_frames = 0
+        self.lost_frames = 0  # gaps in the binary sequence numbers
+        self.malformed_frames = 0  # text lines that are not a valid STATUS line
+        self.backlog = Histogram(BACKLOG_BUCKETS)  # bytes already waiting after each read
+        self.error = None  # why the reader stopped
+        self.disconnects = 0
+        self.downtime = 0.0  # seconds spent disconnected, up to the last reconnect
+        self.last_data_at = None  # perf_counter() of the last bytes read
+        self.decoder = BinaryFrameDecoder() if binary else None
+        self.clock = DeviceClock()
+        self._last_seq = None
+        self._stop_event = Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self.last_data_at = perf_counter()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def reopen(self, ser, binary):
+        # Carry on reading from a freshly opened port. Opening it rebooted the box, so its
+        # sequence numbers and millis() start over.
+        crc_errors = self.decoder.crc_errors if self.decoder else 0
+        self.ser = ser
+        self.binary = binary
+        self.decoder = BinaryFrameDecoder() if binary else None
+        if self.decoder:
+            self.decoder.crc_errors = crc_errors
+        self.clock = DeviceClock()
+        self._last_seq = None
+        self.error = None
+        self.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.binary:
+                    waiting = self.ser.in_waiting
+                    raw = self.ser.read(max(1, waiting))
+                else:
+                    raw = self.ser.readline()
+                    waiting = self.ser.in_waiting
+            except (serial.SerialException, OSError, TypeError) as e:
+                self.error = str(e) or type(e).__name__
+                break  # port closed or unplugged
+            self.backlog.add(waiting)
+            if not raw:
+                continue  # read timeout, nothing arrived
+            self.last_data_at = perf_counter()
+            if self.binary:
+                received_at = perf_counter()
+                for seq, device_ms, readings in self.decoder.feed(raw):
+                    if self._last_seq is not None:
+                        self.lost_frames += (seq - self._last_seq - 1) & 0xFFFF
+                    self._last_seq = seq
+                    sampled_at = self.clock.map(device_ms, received_at)
+                    self._publish(Frame(received_at, self.device, readings, seq, device_ms, sampled_at=sampled_at))
+            else:
+                # Text frames carry no device time; arrival is the best estimate
+                readings = parse_status_line(raw)
+                if readings is not None:
+                    received_at = perf_counter()
+                    self._publish(Frame(received_at, self.device, readings, sampled_at=received_at))
+                else:
+                    self.malformed_frames += 1
+
+    def _publish(self, frame):
+        # Keep the newest data if consumers fall behind: drop the oldest queued frame
+        self.dropped_frames += put_dropping_oldest(self.frames, frame)
+
+class AcquisitionManager:
+    # Runs one AcquisitionEngine per TURTLE box, all feeding a single bounded queue, and maps
+    # each device's local T1, T2, ... onto one global channel numbering in the order channels
+    # are first seen. With several boxes that order depends on which box answers first, so
+    # recordings store the mapping (see AcquisitionCore._map_channels). Only the consumer
+    # thread calls channel_index().
+    def __init__(self, max_frames=4096):
+        self.frames = Queue(maxsize=max_frames)
+        self.engines = []
+        self.ports = []
+        self.channel_ids = {}
+        self.channel_sources = []
+
+    def add_device(self, ser, binary=False):
+        engine = AcquisitionEngine(ser, device=len(self.engines), frames=self.frames, binary=binary)
+        self.engines.append(engine)
+        self.ports.append(ser.port)
+        return engine
+
+    def start(self):
+        for engine in self.engines:
+            engine.start()
+
+    def stop(self):
+        for engine in self.engines:
+            engine.stop()
+
+    def is_running(self):
+        return any(engine.is_running() for engine in self.engines)
+
+    @property
+    def dropped_frames(self):
+        return sum(engine.dropped_frames for engine in self.engines)
+
+    def channel_index(self, device, local_index):
+        key = (device, local_index)
+        index = self.channel_ids.get(key)
+        if index is None:
+            index = len(self.channel_sources)
+            self.channel_ids[key] = index
+            self.channel_sources.append(key)
+        return index
+
+    def channel_title(self, index):
+        device, local_index = self.channel_sources[index]
+        if len(self.engines) == 1:
+            return f"Thermocouple {index+1}:"
+        return f"Thermocouple {index+1} ({self.ports[device]} T{local_index+1}):"
+
+    def global_frame(self, frame):
+        readings = [(self.channel_index(frame.device, index), temp_c) for index, temp_c in frame.readings]
+        return frame._replace(readings=readings)
+
+class SampleStore:
+    # Columnar per-channel storage for recorded readings. Each channel keeps one preallocated
+    # (capacity, 2) float64 array of [timestamp, temp_c] rows that doubles when full, so appends
+    # are amortized O(1) and view() returns zero-copy slices of the filled part. With
+    # max_per_channel set, the oldest half of a channel is discarded when it reaches the cap.
+    INITIAL_CAPACITY = 4096
+
+    def __init__(self, max_per_channel=None):
+        self.max_per_channel = max_per_channel
+        self.version = 0
+        self.clear()
+
+    def clear(self):
+        # tc_id -> (array, filled row count), swapped as one tuple so readers never see a
+        # count that does not belong to the array
+        self._series = {}
+        self.version += 1  # never reused, so caches keyed on version stay valid across clears
+        self.dropped = 0
+
+    def append(self, tc_id, timestamp, temp_c):
+        columns, n = self._series.get(tc_id, (None, 0))
+        if columns is None:
+            columns = np.empty((self.INITIAL_CAPACITY, 2), dtype=np.float64)
+        elif self.max_per_channel is not None and n >= self.max_per_channel:
+            keep = self.max_per_channel // 2
+            trimmed = np.empty_like(columns)
+            trimmed[:keep] = columns[n - keep:n]
+            self.dropped += n - keep
+            columns, n = trimmed, keep
+        elif n == len(columns):
+            grown = np.empty((2 * len(columns), 2), dtype=np.float64)
+            grown[:n] = columns[:n]
+            columns = grown
+        columns[n, 0] = timestamp
+        columns[n, 1] = temp_c
+        self._series[tc_id] = (columns, n + 1)
+        self.version += 1
+
+    def extend(self, tc_id, timestamps, temps):
+        columns, n = self._series.get(tc_id, (None, 0))
+        count = len(timestamps)
+        if columns is None or n + count > len(columns):
+            # Doubling like append, so reading a file block by block stays linear
+            capacity = max(self.INITIAL_CAPACITY, n + count, 2 * len(columns) if columns is not None else 0)
+            grown = np.empty((capacity, 2), dtype=np.float64)
+            if n:
+                grown[:n] = columns[:n]
+            columns = grown
+        columns[n:n + count, 0] = timestamps
+        columns[n:n + count, 1] = temps
+        self._series[tc_id] = (columns, n + count)
+        self.version += 1
+
+    def channels(self):
+        return sorted(self._series)
+
+    def view(self, tc_id):
+        columns, n = self._series.get(tc_id, (None, 0))
+        if columns is None:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty
+        return columns[:n, 0], columns[:n, 1]
+
+    def __len__(self):
+        return sum(n for _, n in self._series.values())
+
+    def nbytes(self):
+        return sum(columns.nbytes for columns, _ in self._series.values())
+
+# Segments scanned per block when looking for crossings, so a memory-mapped archive is read
+# a block at a time and only as far as the crossings
+CROSSING_CHUNK = 1 << 18
+
+def _first_crossings(t, y, levels, first_segment):
+    # For each level, the first segment [i, i+1] with i >= first_segment[level] where the series
+    # passes through that level, and the linearly interpolated crossing time. Segment is -1
+    # where the level is never crossed.
+    segments = np.full(len(levels), -1, dtype=np.int64)
+    pending = np.ones(len(levels), dtype=bool)
+    n = len(y) - 1
+    for lo in range(int(first_segment.min()) if len(levels) else n, n, CROSSING_CHUNK):
+        hi = min(lo + CROSSING_CHUNK, n)
+        pending_levels = np.flatnonzero(pending)
+        offsets = np.asarray(y[lo:hi + 1])[np.newaxis, :] - levels[pending_levels, np.newaxis]
+        crossed = offsets[:, :-1] * offsets[:, 1:] <= 0
+        crossed &= np.arange(lo, hi)[np.newaxis, :] >= first_segment[pending_levels, np.newaxis]
+        found = crossed.any(axis=1)
+        segments[pending_levels[found]] = lo + crossed[found].argmax(axis=1)
+        pending[pending_levels[found]] = False
+        if not pending.any():
+            break
+    at = np.maximum(segments, 0)
+    y0, y1 = np.asarray(y[at]), np.asarray(y[at + 1])
+    t0, t1 = np.asarray(t[at]), np.asarray(t[at + 1])
+    rise = np.where(y1 != y0, y1 - y0, 1.0)
+    fraction = np.where(y1 != y0, (levels - y0) / rise, 0.0)
+    return segments, t0 + fraction * (t1 - t0)
+
+def interval_cooling_rates(t, y, starts, ends):
+    # Rates in degrees/min between the first crossing of each start level and the first later
+    # crossing of the matching end level, for all intervals at once. NaN where not crossed.
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    nan = np.full(len(starts), np.nan)
+    if len(t) < 2:
+        return nan, nan, nan
+    start_segments, start_times = _first_crossings(t, y, starts, np.zeros(len(starts), dtype=np.int64))
+    end_segments, end_times = _first_crossings(t, y, ends, np.maximum(start_segments, 0))
+    # Both levels inside one segment can interpolate out of order; take the next end crossing
+    retry = (start_segments >= 0) & (end_segments >= 0) & (end_times <= start_times)
+    if retry.any():
+        retry_segments, retry_times = _first_crossings(t, y, ends, start_segments + 1)
+        end_segments = np.where(retry, retry_segments, end_segments)
+        end_times = np.where(retry, retry_times, end_times)
+    valid = (start_segments >= 0) & (end_segments >= 0) & (end_times > start_times)
+    duration = np.where(valid, end_times - start_times, 1.0)
+    rates = np.where(valid, (ends - starts) / duration * 60, np.nan)
+    return rates, np.where(valid, start_times, np.nan), np.where(valid, end_times, np.nan)
+
+def calculate_cooling_rates(samples, intervals):
+    # {tc_id: [result dict or None for each (start_temp, end_temp) interval]}
+    starts = [start for start, _ in intervals]
+    ends = [end for _, end in intervals]
+    results = {}
+    for tc_id in samples.channels():
+        timestamps, temps = samples.view(tc_id)
+        rates, start_times, end_times = interval_cooling_rates(timestamps, temps, starts, ends)
+        results[tc_id] = [
+            None if np.isnan(rate) else {
+                'cooling_rate': round(float(rate), 2),
+                'interval1_temp': start,
+                'interval2_temp': end,
+                'interval1_time': round(float(start_time), 2),
+                'interval2_time': round(float(end_time), 2)
+            }
+            for rate, start, end, start_time, end_time in zip(rates, starts, ends, start_times, end_times)
+        ]
+    return results
+
+# Samples reduced per block by minmax_decimate
+DECIMATE_BLOCK = 1 << 20
+
+def minmax_decimate(x, y, x_min, x_max, buckets):
+    # Reduce the part of a time-ordered series inside [x_min, x_max] to the first/last point and
+    # the min and max of each of `buckets` equal-count slices, which preserves the visual envelope
+    lo = max(int(np.searchsorted(x, x_min, 'left')) - 1, 0)
+    hi = min(int(np.searchsorted(x, x_max, 'right')) + 1, len(x))
+    x, y = x[lo:hi], y[lo:hi]
+    n = len(x)
+    if buckets < 1 or n <= 2 * buckets:
+        return x, y
+    size = n // buckets
+    used = size * buckets
+    # Buckets are reduced a block at a time, so a memory-mapped archive is streamed through
+    # rather than copied whole
+    step = max(DECIMATE_BLOCK // size, 1) * size
+    parts = [[0]]
+    for start in range(0, used, step):
+        sliced = np.asarray(y[start:min(start + step, used)]).reshape(-1, size)
+        offsets = start + np.arange(len(sliced)) * size
+        parts += [sliced.argmin(axis=1) + offsets, sliced.argmax(axis=1) + offsets]
+    parts += [np.arange(used, n), [n - 1]]
+    indices = np.unique(np.concatenate(parts))
+    return x[indices], y[indices]
+
+# Export limits: rows per Excel sheet (including the header) and rows per streamed block
+EXCEL_MAX_ROWS = 1048576
+EXPORT_CHUNK_ROWS = 65536
+
+def wide_row_times(series):
+    # Sorted distinct timestamps across all channels, one per row of the exported table
+    if not series:
+        return np.empty(0, dtype=np.float64)
+    return np.unique(np.concatenate([timestamps for timestamps, _ in series.values()]))
+
+def iter_wide_chunks(series, row_times, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Yields (timestamps, [temps per channel]) blocks of the wide export layout, NaN where a
+    # channel has no reading at that time, without building the whole pivoted table
+    channels = sorted(series)
+    for start in range(0, len(row_times), chunk_rows):
+        times = row_times[start:start + chunk_rows]
+        columns = []
+        for tc_id in channels:
+            timestamps, temps = series[tc_id]
+            lo = np.searchsorted(timestamps, times[0], 'left')
+            hi = np.searchsorted(timestamps, times[-1], 'right')
+            column = np.full(len(times), np.nan)
+            column[np.searchsorted(times, timestamps[lo:hi])] = temps[lo:hi]
+            columns.append(column)
+        yield times, columns
+
+def export_headers(series, temp_unit):
+    return ['Elapsed Time (s)'] + [f'Thermocouple {tc_id} (°{temp_unit})' for tc_id in sorted(series)]
+
+def write_excel_export(job, path, series, temp_unit, cooling_rates):
+    import xlsxwriter
+
+    # constant_memory keeps only the current row in memory, so rows must be written in order
+    row_times = wide_row_times(series)
+    total_rows = len(row_times)
+    headers = export_headers(series, temp_unit)
+    rows_per_sheet = EXCEL_MAX_ROWS - 1
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    sheets = []
+
+    def add_data_sheet():
+        name = 'Temperature Data' if not sheets else f'Temperature Data {len(sheets) + 1}'
+        sheet = workbook.add_worksheet(name)
+        for col_num, value in enumerate(headers):
+            sheet.set_column(col_num, col_num, max(len(value), 15))
+            sheet.write_string(0, col_num, value)
+        sheets.append(sheet)
+        return sheet
+
+    try:
+        sheet = add_data_sheet()
+        row = 1
+        written = 0
+        for times, columns in iter_wide_chunks(series, row_times):
+            rows = zip(times.tolist(), *(column.tolist() for column in columns))
+            for values in rows:
+                if row > rows_per_sheet:
+                    sheet = add_data_sheet()
+                    row = 1
+                for col_num, value in enumerate(values):
+                    if value == value:  # NaN cells stay blank
+                        sheet.write_number(row, col_num, value)
+                row += 1
+            written += len(times)
+            job.report(written / total_rows)
+
+        # Line chart of the first sheet, placed two columns right of the data
+        temperature_sheet = sheets[0]
+        num_rows = min(total_rows, rows_per_sheet)
+        chart = workbook.add_chart({'type': 'line'})
+        for col_num, tc_id in enumerate(sorted(series), 1):
+            chart.add_series({
+                'name': f'Thermocouple {tc_id}',
+                'categories': [temperature_sheet.name, 1, 0, num_rows, 0],
+                'values': [temperature_sheet.name, 1, col_num, num_rows, col_num],
+            })
+        chart.set_title({'name': 'Thermocouple Temperature Data'})
+        chart.set_x_axis({'name': 'Elapsed Time (s)'})
+        chart.set_y_axis({'name': f'Temperature (°{temp_unit})'})
+        chart.set_legend({'position': 'bottom'})
+        info_col = len(headers) + 2
+        temperature_sheet.insert_chart(1, info_col, chart)
+
+        # Cooling rate information goes below the data, or on its own sheet if the data was split
+        if len(sheets) == 1:
+            info_sheet = temperature_sheet
+            row_offset = num_rows + 5
+        else:
+            info_sheet = workbook.add_worksheet('Cooling Rate Information')
+            info_col = 0
+            row_offset = 0
+        info_sheet.write(row_offset, info_col, 'Cooling Rate Information:')
+
+        row = row_offset + 1
+        for tc_id in sorted(cooling_rates):
+            data = cooling_rates[tc_id]
+            if data:  # Ensure data exists
+                info_sheet.write(row, info_col, f'Thermocouple {tc_id}:')
+                info_sheet.write(row + 1, info_col, f'Cooling Rate: {data["cooling_rate"]}°{temp_unit}/min')
+                info_sheet.write(row + 2, info_col, f'Interval 1 Temp: {data["interval1_temp"]}°{temp_unit}')
+                info_sheet.write(row + 3, info_col, f'Interval 2 Temp: {data["interval2_temp"]}°{temp_unit}')
+                info_sheet.write(row + 4, info_col, f'Interval 1 Time: {data["interval1_time"]}s')
+                info_sheet.write(row + 5, info_col, f'Interval 2 Time: {data["interval2_time"]}s')
+                row += 7  # Move to the next block for the next thermocouple
+
+        if row == row_offset + 1:  # If no cooling rate data was written
+            info_sheet.write(row_offset + 2, info_col, 'No cooling rate data available.')
+    finally:
+        workbook.close()
+
+def write_csv_export(job, path, series, temp_unit, cooling_rates):
+    import pandas as pd
+
+    row_times = wide_row_times(series)
+    headers = export_headers(series, temp_unit)
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for times, columns in iter_wide_chunks(series, row_times):
+            block = pd.DataFrame(dict(zip(headers, [times] + columns)))
+            block.to_csv(f, index=False, header=(written == 0), na_rep='', lineterminator='\n')
+            written += len(times)
+            job.report(written / len(row_times))
+
+def write_parquet_export(job, path, series, temp_unit, cooling_rates):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    row_times = wide_row_times(series)
+    headers = export_headers(series, temp_unit)
+    schema = pa.schema([(header, pa.float64()) for header in headers])
+    written = 0
+    # Each streamed block becomes one Parquet row group
+    with pq.ParquetWriter(path, schema) as writer:
+        for times, columns in iter_wide_chunks(series, row_times):
+            arrays = [pa.array(times)] + [pa.array(column, from_pandas=True) for column in columns]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            written += len(times)
+            job.report(written / len(row_times))
+
+EXPORT_WRITERS = {
+    '.xlsx': write_excel_export,
+    '.csv': write_csv_export,
+    '.parquet': write_parquet_export,
+}
+
+class ExportCancelled(Exception):
+    pass
+
+class ExportJob:
+    # Runs one export writer on a worker thread. The GUI polls progress/done/error from a timer;
+    # writers call report() between blocks, which is also where cancellation takes effect.
+    def __init__(self, writer, path, *args):
+        self.path = path
+        self.progress = 0.0
+        self.error = None
+        self.done = False
+        self.started_at = None
+        self.duration = None
+        self._writer = writer
+        self._args = args
+        self._cancel_event = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started_at = perf_counter()
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def report(self, fraction):
+        if self._cancel_event.is_set():
+            raise ExportCancelled()
+        self.progress = fraction
+
+    def _run(self):
+        try:
+            self._writer(self, self.path, *self._args)
+        except Exception as e:
+            if not isinstance(e, ExportCancelled):
+                self.error = e
+            # Don't leave a truncated file behind
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        finally:
+            self.duration = perf_counter() - self.started_at
+            self.done = True
+
+def attach_shared_memory(name=None, size=0):
+    # Creates a shared memory block (name None) or attaches to an existing one. Before Python
+    # 3.13 an attaching process also registers the block with its resource tracker, which
+    # unlinks it when that process exits; only the creator owns it here. Processes started by
+    # multiprocessing share their parent's tracker, where registering again changes nothing.
+    import multiprocessing
+    from multiprocessing import shared_memory, resource_tracker
+
+    if name is None:
+        return shared_memory.SharedMemory(create=True, size=max(size, 1))
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    block = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix' and multiprocessing.parent_process() is None:
+        resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+class SharedSeries:
+    # {tc_id: (timestamps, temps)} handed to a worker process as zero-copy numpy views. In-memory
+    # samples are copied once into a shared memory block; an archive is passed by path and row
+    # count, since its memory map is already shared through the OS page cache. Pickles to a
+    # small handle; the creating process calls close() once the worker has exited.
+    def __init__(self, samples):
+        self.archive = None
+        self.name = None
+        self.layout = []  # (tc_id, offset, rows) in float64 units of the block
+        self._block = None
+        self._series = None
+        if isinstance(samples, RecordingArchive):
+            self.archive = samples.path
+            self.layout = [(tc_id, 0, len(samples.view(tc_id)[0])) for tc_id in samples.channels()]
+            return
+        series = {tc_id: samples.view(tc_id) for tc_id in samples.channels()}
+        self._block = attach_shared_memory(size=8 * 2 * sum(len(timestamps) for timestamps, _ in series.values()))
+        self.name = self._block.name
+        buffer = np.ndarray((self._block.size // 8,), dtype=np.float64, buffer=self._block.buf)
+        offset = 0
+        for tc_id, (timestamps, temps) in sorted(series.items()):
+            rows = len(timestamps)
+            buffer[offset:offset + rows] = timestamps
+            buffer[offset + rows:offset + 2 * rows] = temps
+            self.layout.append((tc_id, offset, rows))
+            offset += 2 * rows
+
+    def __getstate__(self):
+        return {'archive': self.archive, 'name': self.name, 'layout': self.layout}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _block=None, _series=None)
+
+    def series(self):
+        # In the worker: the views, attaching on first use
+        if self._series is None:
+            if self.archive is not None:
+                archive = RecordingArchive(self.archive)
+                self._series = {}
+                for tc_id, _, rows in self.layout:
+                    timestamps, temps = archive.view(tc_id)
+                    self._series[tc_id] = (timestamps[:rows], temps[:rows])
+            else:
+                if self._block is None:
+                    self._block = attach_shared_memory(self.name)
+                buffer = np.ndarray((self._block.size // 8,), dtype=np.float64, buffer=self._block.buf)
+                self._series = {
+                    tc_id: (buffer[offset:offset + rows], buffer[offset + rows:offset + 2 * rows])
+                    for tc_id, offset, rows in self.layout
+                }
+        return self._series
+
+    def close(self):
+        # In the creating process, after the worker is done with the block
+        self._series = None
+        if self._block is not None and self.name is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+def _run_worker(writer, path, args, progress, cancel, errors):
+    # Body of a ProcessExportJob's process
+    job = _WorkerReport(progress, cancel)
+    args = [arg.series() if isinstance(arg, SharedSeries) else arg for arg in args]
+    try:
+        writer(job, path, *args)
+    except ExportCancelled:
+        pass
+    except Exception as e:
+        errors.put(f"{type(e).__name__}: {e}")
+
+class _WorkerReport:
+    # What a writer sees as its job inside the worker process
+    def __init__(self, progress, cancel):
+        self._progress = progress
+        self._cancel = cancel
+
+    def report(self, fraction):
+        if self._cancel.is_set():
+            raise ExportCancelled()
+        self._progress.value = fraction
+
+class ProcessExportJob(ExportJob):
+    # ExportJob whose writer runs in a separate process, so pandas, xlsxwriter and pyarrow
+    # can't hold the GIL the serial readers and the GUI need. The arguments must pickle; pass
+    # the data as a SharedSeries. The job's own thread just watches the process.
+    POLL_INTERVAL = 0.05
+
+    def _run(self):
+        import multiprocessing
+
+        context = multiprocessing.get_context('spawn')  # forking a process with Qt and threads is unsafe
+        progress = context.Value('d', 0.0, lock=False)
+        cancel = context.Event()
+        errors = context.SimpleQueue()
+        process = context.Process(target=_run_worker, args=(self._writer, self.path, self._args, progress, cancel, errors),
+                                  daemon=True)
+        try:
+            process.start()
+            while process.is_alive():
+                process.join(self.POLL_INTERVAL)
+                self.progress = progress.value
+                if self._cancel_event.is_set():
+                    cancel.set()
+            if not errors.empty():
+                self.error = RuntimeError(errors.get())
+            elif process.exitcode != 0 and not self._cancel_event.is_set():
+                self.error = RuntimeError(f"The export process stopped unexpectedly (exit code {process.exitcode})")
+        except Exception as e:
+            self.error = e
+        finally:
+            for arg in self._args:
+                if isinstance(arg, SharedSeries):
+                    arg.close()
+            if self.error is not None or self._cancel_event.is_set():
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+            self.duration = perf_counter() - self.started_at
+            self.done = True
+
+class RecordingLog:
+    # Append-only CSV log of one recording. Rows are buffered and flushed to disk (with fsync)
+    # at most once per FLUSH_INTERVAL, so an unclean shutdown loses at most that much data.
+    # A clean close appends an "# end,<rows>" footer; logs missing it are repaired by recover().
+    # Lost connections are marked with "# gap," lines (see mark_gap), and the box behind each
+    # column with "# channel," lines (see map_channel).
+    # Each frame is one row: timestamp, device, seq, device_ms, then T1, T2, ... with blanks
+    # for open thermocouples and other boxes' channels. Rows grow when a channel first appears
+    # after the header was written. While a log is open its "<log>.lock" file is locked, so
+    # recovery in another process (the app next to a running daemon) leaves it alone.
+    COLUMNS = ['timestamp', 'device', 'seq', 'device_ms']
+    FLUSH_INTERVAL = 1.0
+    STARTED = "# TURTLE recording started"
+    RECOVER_BLOCK = 1 << 20
+
+    def __init__(self, path, channels=0):
+        self.path = path
+        self.rows = 0
+        self._lock = Lock()
+        # 'x' so an existing log is never overwritten; see AcquisitionCore._create_recording_log
+        self._file = open(path, 'x', encoding='utf-8', newline='', buffering=1 << 16)
+        self._owner = self.claim(path)
+        self._file.write(f"{self.STARTED} {datetime.now().isoformat(timespec='seconds')}\n")
+        self._file.write(",".join(self.COLUMNS + [f"T{i+1}" for i in range(channels)]) + "\n")
+        self._flush_locked()
+
+    def write(self, timestamp, frame):
+        temps = [''] * (max((index for index, _ in frame.readings), default=-1) + 1)
+        for index, temp_c in frame.readings:
+            if temp_c is not None:
+                temps[index] = f"{temp_c:.7g}"  # float32 precision; str() of one gives 17 digits
+        seq = '' if frame.seq is None else frame.seq
+        device_ms = '' if frame.device_ms is None else frame.device_ms
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(f"{timestamp},{frame.device},{seq},{device_ms},{','.join(temps)}\n")
+            self.rows += 1
+            if perf_counter() - self._last_flush >= self.FLUSH_INTERVAL:
+                self._flush_locked()
+
+    def mark_gap(self, device, start, end):
+        # "# gap,<device>,<start>,<end>": the device's port was lost between these timestamps,
+        # so its missing rows are an outage rather than open thermocouples
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(f"# gap,{device},{start},{end}\n")
+            self._flush_locked()
+
+    def map_channel(self, tc_id, port, local_id):
+        # "# channel,<tc_id>,<port>,<local_id>": column T<tc_id> is T<local_id> of the box on port
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(f"# channel,{tc_id},{port},{local_id}\n")
+
+    @staticmethod
+    def read_gaps(path):
+        # [(device, start, end)] of the gaps marked in a log
+        gaps = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith("# gap,"):
+                    _, device, start, end = line.rstrip("\n").split(",")
+                    gaps.append((int(device), float(start), float(end)))
+        return gaps
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_flush = perf_counter()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(f"# end,{self.rows}\n")
+            self._flush_locked()
+            self._file.close()
+            self._file = None
+            self.release(self.path, self._owner)
+
+    @staticmethod
+    def claim(path):
+        # Locks path's lock file and returns it, or None while another process holds it. The OS
+        # drops the lock when its holder exits, so a crashed recording can be claimed again.
+        lock_file = open(path + '.lock', 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    @staticmethod
+    def release(path, lock_file):
+        if lock_file is None:
+            return
+        lock_file.close()
+        try:
+            os.remove(path + '.lock')
+        except OSError:
+            pass
+
+    @classmethod
+    def is_log(cls, path):
+        # Only files that start like a RecordingLog are logs; exports and reports are left alone
+        with open(path, 'rb') as f:
+            return f.readline().startswith(cls.STARTED.encode())
+
+    @staticmethod
+    def is_complete(path):
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 64))
+            last_line = f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        return last_line.startswith(b"# end,") or last_line.startswith(b"# recovered,")
+
+    @classmethod
+    def recover(cls, path):
+        # Drop a torn final row left by a crash and mark the log as recovered. Logs can be
+        # gigabytes, so the last newline is found from the end and rows are counted a block at
+        # a time.
+        with open(path, 'rb+') as f:
+            complete = f.seek(0, os.SEEK_END)
+            while complete > 0:
+                start = max(complete - cls.RECOVER_BLOCK, 0)
+                f.seek(start)
+                newline = f.read(complete - start).rfind(b"\n")
+                if newline >= 0:
+                    complete = start + newline + 1
+                    break
+                complete = start
+            # Every line but the CSV header and the comment lines is a row
+            f.seek(0)
+            lines = comments = 0
+            previous = b"\n"
+            remaining = complete
+            while remaining:
+                block = f.read(min(remaining, cls.RECOVER_BLOCK))
+                remaining -= len(block)
+                lines += block.count(b"\n")
+                comments += block.count(b"\n#") + (previous == b"\n" and block[:1] == b"#")
+                previous = block[-1:]
+            rows = max(lines - comments - 1, 0)
+            f.seek(complete)
+            f.truncate()
+            f.write(f"# recovered,{rows}\n".encode())
+        return rows
+
+    @staticmethod
+    def read_blocks(path, chunk_rows=EXPORT_CHUNK_ROWS):
+        # Yields (fraction read, {tc_id: (timestamps, temps)}) blocks of a log, NaN where a
+        # channel had no reading. Also reads the older timestamp,tc_id,temp_c layout.
+        import pandas as pd
+
+        # Name enough columns for the widest row so channels added mid-recording are kept
+        with open(path, encoding='utf-8') as f:
+            f.readline()
+            header = f.readline().rstrip('\n').split(',')
+            width = max((line.count(',') + 1 for line in f if not line.startswith('#')), default=0)
+        size = max(os.path.getsize(path), 1)
+        long_format = header == ['timestamp', 'tc_id', 'temp_c']
+        if long_format:
+            names = header
+        else:
+            names = header + [f"T{i - len(RecordingLog.COLUMNS) + 1}" for i in range(len(header), width)]
+        with open(path, 'rb') as f:
+            for df in pd.read_csv(f, comment='#', skiprows=2, header=None, names=names, chunksize=chunk_rows):
+                timestamps = df['timestamp'].to_numpy(dtype=np.float64)
+                if long_format:
+                    tc_ids = df['tc_id'].to_numpy()
+                    temps = df['temp_c'].to_numpy(dtype=np.float64)
+                    block = {int(tc_id): (timestamps[tc_ids == tc_id], temps[tc_ids == tc_id]) for tc_id in np.unique(tc_ids)}
+                else:
+                    block = {int(name[1:]): (timestamps, df[name].to_numpy(dtype=np.float64))
+                             for name in names[len(RecordingLog.COLUMNS):]}
+                yield f.tell() / size, block
+
+def find_arduino_ports():
+    ports = []
+    for port in sorted(list_ports.comports(), key=lambda port: port.device):
+        if "Arduino" in port.description or any(vid_pid in port.hwid for vid_pid in ARDUINO_VID_PIDS):
+            ports.append(port.device)
+    return ports
+
+def recover_recording_logs(directory=RECORDINGS_DIR):
+    # Repair every log in directory that was left without a footer and that no running core is
+    # still writing; returns their file names
+    if not os.path.isdir(directory):
+        return []
+    recovered = []
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if not filename.endswith('.csv'):
+            continue
+        try:
+            if not RecordingLog.is_log(path) or RecordingLog.is_complete(path):
+                continue
+            owner = RecordingLog.claim(path)
+            if owner is None:
+                continue  # still being recorded
+            try:
+                RecordingLog.recover(path)
+            finally:
+                RecordingLog.release(path, owner)
+            recovered.append(filename)
+        except OSError:
+            pass
+    return recovered
+
+class ArchiveWriter:
+    # Appends rows to a RecordingArchive directory: one T<id>.f64 file per channel of float64
+    # [timestamp, temp_c] rows, buffered and written at most once per FLUSH_INTERVAL. Row
+    # counts come from the file sizes, so an archive cut short by a crash still opens. On close
+    # meta.json records the size and mtime of the source file, so a stale archive can be told
+    # from a current one.
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, path, source=None):
+        self.path = path
+        self.rows = {}
+        self._buffers = {}
+        self._lock = Lock()
+        self._source_path = source and os.path.join(os.path.dirname(path), source)
+        os.makedirs(path)
+        self._meta = {
+            'format': RecordingArchive.FORMAT,
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+            'complete': False,
+            'gaps': [],
+            'channels': {},
+        }
+        self._write_meta()
+        self._last_flush = perf_counter()
+
+    def append(self, tc_id, timestamp, temp_c):
+        with self._lock:
+            if self._buffers is None:
+                return
+            self._buffers.setdefault(tc_id, []).append((timestamp, temp_c))
+            if perf_counter() - self._last_flush >= self.FLUSH_INTERVAL:
+                self._flush_locked()
+
+    def extend(self, tc_id, timestamps, temps):
+        rows = np.column_stack((timestamps, temps)).astype(np.float64, copy=False)
+        with self._lock:
+            self._flush_locked()
+            self._write_rows(tc_id, rows)
+
+    def mark_gap(self, device, start, end):
+        # Same as RecordingLog.mark_gap, kept in meta.json as [device, start, end]
+        with self._lock:
+            if self._buffers is None:
+                return
+            self._meta['gaps'].append([device, start, end])
+            self._write_meta()
+
+    def map_channel(self, tc_id, port, local_id):
+        # Same as RecordingLog.map_channel, kept in meta.json as tc_id: [port, local_id]
+        with self._lock:
+            if self._buffers is None:
+                return
+            self._meta['channels'][str(tc_id)] = [port, local_id]
+            self._write_meta()
+
+    def flush(self):
+        with self._lock:
+            if self._buffers is not None:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        for tc_id, buffer in self._buffers.items():
+            if buffer:
+                self._write_rows(tc_id, np.array(buffer, dtype=np.float64))
+                buffer.clear()
+        self._last_flush = perf_counter()
+
+    def _write_rows(self, tc_id, rows):
+        with open(os.path.join(self.path, f"T{tc_id}.f64"), 'ab') as f:
+            rows.tofile(f)
+        self.rows[tc_id] = self.rows.get(tc_id, 0) + len(rows)
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f, indent=2)
+
+    def close(self, source_stat=None):
+        # source_stat is the source as it was read; by default it is taken now
+        with self._lock:
+            if self._buffers is None:
+                return
+            self._flush_locked()
+            self._buffers = None
+            self._meta['complete'] = True
+            self._meta['rows'] = {str(tc_id): rows for tc_id, rows in sorted(self.rows.items())}
+            try:
+                source_stat = source_stat or (self._source_path and os.stat(self._source_path))
+            except OSError:
+                source_stat = None
+            if source_stat:
+                self._meta['source_size'] = source_stat.st_size
+                self._meta['source_mtime_ns'] = source_stat.st_mtime_ns
+            self._write_meta()
+
+class RecordingArchive:
+    # Read side of an archive written by ArchiveWriter, with the SampleStore interface, so the
+    # graph, cooling rate and export code run on it unchanged. Channels are memory-mapped, so
+    # opening is instant and only the pages that are actually read are loaded, whatever the
+    # archive's size.
+    FORMAT = 'turtle-archive-1'
+    SUFFIX = '.turtle'
+    ROW_BYTES = 16
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != self.FORMAT:
+            raise ValueError(f"{path} is not a TURTLE recording archive")
+        self._series = {}
+        for filename in os.listdir(path):
+            match = re.fullmatch(r'T(\d+)\.f64', filename)
+            if match:
+                filepath = os.path.join(path, filename)
+                rows = os.path.getsize(filepath) // self.ROW_BYTES  # a torn final row is ignored
+                if rows:
+                    self._series[int(match.group(1))] = np.memmap(filepath, dtype=np.float64, mode='r', shape=(rows, 2))
+        self.version = sum(len(columns) for columns in self._series.values())
+        self.dropped = 0
+
+    def channels(self):
+        return sorted(self._series)
+
+    def view(self, tc_id):
+        columns = self._series.get(tc_id)
+        if columns is None:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty
+        return columns[:, 0], columns[:, 1]
+
+    def time_range(self):
+        ends = [(columns[0, 0], columns[-1, 0]) for columns in self._series.values()]
+        if not ends:
+            return None
+        return min(start for start, _ in ends), max(end for _, end in ends)
+
+    def __len__(self):
+        return self.version
+
+    def nbytes(self):
+        return self.version * self.ROW_BYTES
+
+def archive_path(path):
+    # Where the archive of a recording log or an exported file lives: alongside it, keeping the
+    # extension so x.csv, x.xlsx and x.parquet each get their own
+    return path + RecordingArchive.SUFFIX
+
+def _export_blocks(path):
+    # Yields (fraction read, {tc_id: (timestamps, temps)}) from a TURTLE_Data export
+    import pandas as pd
+
+    def block(df):
+        df = df.dropna(subset=['Elapsed Time (s)'])
+        timestamps = pd.to_numeric(df['Elapsed Time (s)'], errors='coerce').to_numpy(dtype=np.float64)
+        channels = {}
+        for column in df.columns:
+            match = re.match(r'Thermocouple (\d+)', str(column))
+            if match:
+                channels[int(match.group(1))] = (timestamps, pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64))
+        return channels
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        # Excel has no streaming reader; this is the one slow read an import saves from then on
+        sheets = pd.read_excel(path, sheet_name=None)
+        data_sheets = [name for name in sheets if name.startswith('Temperature Data')]
+        for i, name in enumerate(data_sheets, 1):
+            yield i / len(data_sheets), block(sheets[name])
+    elif extension == '.parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        for i in range(parquet.num_row_groups):
+            yield (i + 1) / parquet.num_row_groups, block(parquet.read_row_group(i).to_pandas())
+    else:
+        size = max(os.path.getsize(path), 1)
+        with open(path, 'rb') as f:
+            for df in pd.read_csv(f, chunksize=EXPORT_CHUNK_ROWS):
+                yield f.tell() / size, block(df)
+
+def archive_source(path):
+    # The file next to an archive that it was built from, if it is still there
+    try:
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            source = json.load(f).get('source')
+    except (OSError, ValueError):
+        return None
+    if source and os.path.isfile(os.path.join(os.path.dirname(path), source)):
+        return os.path.join(os.path.dirname(path), source)
+    return None
+
+def archive_is_current(archive, source):
+    # True when archive was completed from source as source is now, so it can stand in for it
+    try:
+        with open(os.path.join(archive, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        stat = os.stat(source)
+    except (OSError, ValueError):
+        return False
+    return (meta.get('complete') is True and meta.get('source_size') == stat.st_size
+            and meta.get('source_mtime_ns') == stat.st_mtime_ns)
+
+def find_archive(path):
+    # The archive for path (an archive directory, its meta.json, or a log or export it was
+    # built from), or None if it has not been imported yet or the archive next to it is stale
+    if os.path.basename(path) == 'meta.json':
+        path = os.path.dirname(path)
+    if path.endswith(RecordingArchive.SUFFIX) and os.path.isfile(os.path.join(path, 'meta.json')):
+        return path
+    archive = archive_path(path)
+    source = archive_source(archive)
+    if source and os.path.abspath(source) == os.path.abspath(path) and archive_is_current(archive, path):
+        return archive
+    return None
+
+def import_recording(job, path, source):
+    # Builds the archive at path from a recording log or a TURTLE_Data export (.csv, .xlsx or
+    # .parquet), so the recording opens instantly from then on. Runs as an ExportJob writer.
+    source_stat = os.stat(source)
+    with open(source, 'rb') as f:
+        is_log = f.read(1) == b'#'
+    if is_log:
+        # A log still being recorded has its live archive next to it; it must not be replaced
+        owner = RecordingLog.claim(source)
+        if owner is None:
+            raise ValueError(f"{os.path.basename(source)} is still being recorded")
+        RecordingLog.release(source, owner)
+    blocks = RecordingLog.read_blocks(source) if is_log else _export_blocks(source)
+    partial = path + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    writer = ArchiveWriter(partial, source=os.path.basename(source))
+    try:
+        # Outages marked in a log carry over, so the archive tells them from open thermocouples
+        for device, start, end in RecordingLog.read_gaps(source) if is_log else ():
+            writer.mark_gap(device, start, end)
+        for fraction, channels in blocks:
+            for tc_id, (timestamps, temps) in channels.items():
+                valid = ~np.isnan(temps) & ~np.isnan(timestamps)
+                if valid.any():
+                    writer.extend(tc_id, timestamps[valid], temps[valid])
+            job.report(fraction)
+        writer.close(source_stat)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(partial, path)
+
+def load_recording(path):
+    # A whole recording with the SampleStore interface: an archive is memory-mapped, a log or
+    # TURTLE_Data export is read into memory
+    if os.path.isdir(path) or os.path.basename(path) == 'meta.json':
+        return RecordingArchive(find_archive(path) or path)
+    with open(path, 'rb') as f:
+        is_log = f.read(1) == b'#'
+    samples = SampleStore()
+    for _, channels in RecordingLog.read_blocks(path) if is_log else _export_blocks(path):
+        for tc_id, (timestamps, temps) in channels.items():
+            valid = ~np.isnan(temps) & ~np.isnan(timestamps)
+            if valid.any():
+                samples.extend(tc_id, timestamps[valid], temps[valid])
+    return samples
+
+# Triggered recording: a start and a stop condition checked on every reading, and a pre-trigger
+# history of the last few seconds of frames that is written into the run when it starts
+RATE_WINDOW = 10.0
+PRE_TRIGGER_MAX_FRAMES = 1 << 16
+TRIGGER_SPEC = re.compile(r'^\s*(?:T(\d+)\s*:\s*)?(temp|rate)\s*([<>])\s*(-?\d+(?:\.\d*)?|-?\.\d+)\s*$', re.IGNORECASE)
+
+class SlidingRegression:
+    # Least-squares slope of the samples in the last `window` seconds. Running sums make each
+    # sample O(1): it is added once and subtracted once when it leaves the window. The sums are
+    # rebuilt around the oldest sample every REBASE samples so rounding error can't accumulate.
+    REBASE = 4096
+    MIN_SAMPLES = 3
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self._samples = deque()
+        self._origin = None
+        self._since_rebase = 0
+        self._sums = [0.0] * 5  # n, Σt, Σy, Σt², Σty with t relative to _origin
+
+    def add(self, t, y):
+        if self._origin is None:
+            self._origin = t
+        samples = self._samples
+        samples.append((t, y))
+        self._accumulate(t - self._origin, y, 1)
+        while t - samples[0][0] > self.window:
+            old_t, old_y = samples.popleft()
+            self._accumulate(old_t - self._origin, old_y, -1)
+        self._since_rebase += 1
+        if self._since_rebase >= self.REBASE:
+            self._rebase()
+
+    def _accumulate(self, t, y, sign):
+        sums = self._sums
+        sums[0] += sign
+        sums[1] += sign * t
+        sums[2] += sign * y
+        sums[3] += sign * t * t
+        sums[4] += sign * t * y
+
+    def _rebase(self):
+        self._origin = self._samples[0][0]
+        self._sums = [0.0] * 5
+        for t, y in self._samples:
+            self._accumulate(t - self._origin, y, 1)
+        self._since_rebase = 0
+
+    def slope(self):
+        # Units of y per second, or None until the window holds enough samples over at least
+        # half its length
+        n, st, sy, stt, sty = self._sums
+        samples = self._samples
+        if n < self.MIN_SAMPLES or samples[-1][0] - samples[0][0] < self.window / 2:
+            return None
+        denominator = n * stt - st * st
+        if denominator <= 0:
+            return None
+        return (n * sty - st * sy) / denominator
+
+class RecordingTrigger:
+    # A condition on a thermocouple's temperature (°C) or its rate of change (°C/min, the
+    # sliding-window slope; negative while cooling). tc_id None watches every channel and fires
+    # on whichever meets the condition first. Written as e.g. "T1:temp<-50" or "rate<-5".
+    def __init__(self, quantity, comparison, value, tc_id=None, window=RATE_WINDOW):
+        if quantity not in ('temp', 'rate') or comparison not in ('<', '>'):
+            raise ValueError(f"Unknown trigger condition: {quantity} {comparison}")
+        self.quantity = quantity
+        self.comparison = comparison
+        self.value = float(value)
+        self.tc_id = tc_id
+        self.window = window
+        self._regressions = {}
+
+    @classmethod
+    def parse(cls, spec, window=RATE_WINDOW):
+        match = TRIGGER_SPEC.match(spec)
+        if not match:
+            raise ValueError(f"Invalid trigger '{spec}', expected e.g. 'temp<-50', 'T2:rate<-5'")
+        tc_id, quantity, comparison, value = match.groups()
+        return cls(quantity.lower(), comparison, float(value), int(tc_id) if tc_id else None, window)
+
+    def __str__(self):
+        channel = f"T{self.tc_id}:" if self.tc_id is not None else ""
+        return f"{channel}{self.quantity}{self.comparison}{self.value:g}"
+
+    def describe(self):
+        channel = f"T{self.tc_id}" if self.tc_id is not None else "any thermocouple"
+        quantity, unit = ("rate", "°C/min") if self.quantity == 'rate' else ("temperature", "°C")
+        return f"{channel} {quantity} {'above' if self.comparison == '>' else 'below'} {self.value:g} {unit}"
+
+    def update(self, tc_id, t, temp_c):
+        # Feed one reading (t in seconds on any monotonic clock); True if it meets the condition
+        if self.tc_id is not None and tc_id != self.tc_id:
+            return False
+        if self.quantity == 'rate':
+            regression = self._regressions.get(tc_id)
+            if regression is None:
+                regression = self._regressions[tc_id] = SlidingRegression(self.window)
+            regression.add(t, temp_c)
+            slope = regression.slope()
+            if slope is None:
+                return False
+            current = slope * 60
+        else:
+            current = temp_c
+        return current > self.value if self.comparison == '>' else current < self.value
+
+# Published to subscribers alongside frames when a recording starts or stops; trigger is the
+# description of the condition that started or stopped it, None when done by hand
+RecordingEvent = namedtuple('RecordingEvent', ['recording', 'start_time', 'path', 'trigger'], defaults=(None,))
+
+# Published when a box's port is lost (connected False), after each failed reconnect attempt and
+# when it is back. since is the perf_counter() time data stopped and at the time of the event;
+# gap is the (start, end) recording timestamps marked for the outage, None when not recording.
+LinkEvent = namedtuple('LinkEvent', ['device', 'port', 'connected', 'since', 'at', 'attempts', 'error', 'gap'],
+                       defaults=(0, None, None))
+
+class Subscription:
+    # Bounded per-consumer buffer of frames and events. A slow consumer only loses its own
+    # oldest items (counted in dropped); it never holds up acquisition or other consumers.
+    def __init__(self, max_items=1024):
+        self.items = Queue(maxsize=max_items)
+        self.dropped = 0
+
+    def put(self, item):
+        self.dropped += put_dropping_oldest(self.items, item)
+
+    def get(self, timeout=None):
+        return self.items.get(timeout=timeout)
+
+    def drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self.items.get_nowait())
+            except Empty:
+                return items
+
+# Frames kept in the shared ring for worker processes, and channels per frame row
+RING_FRAMES = 1 << 14
+RING_CHANNELS = 32
+
+class FrameRing:
+    # Fan-out of frames to other processes (see TURTLE_Graph.py): a ring of fixed-size rows in
+    # shared memory behind a write counter. The core writes each row and then bumps the
+    # counter; readers never block it and see zero-copy views of the rows. A row's seq is -1
+    # while it is being rewritten, so a reader that was lapped can tell with intact().
+    HEADER_BYTES = 64
+    ROW = np.dtype([
+        ('seq', '<i8'), ('device', '<i8'), ('sampled_at', '<f8'), ('elapsed', '<f8'),
+        ('temps', '<f8', (RING_CHANNELS,))
+    ])
+
+    def __init__(self, name=None, capacity=RING_FRAMES):
+        # name None creates the ring; otherwise attach to it and read from the current position
+        if name is None:
+            self._block = attach_shared_memory(size=self.HEADER_BYTES + capacity * self.ROW.itemsize)
+        else:
+            self._block = attach_shared_memory(name)
+            capacity = (self._block.size - self.HEADER_BYTES) // self.ROW.itemsize
+        self.owner = name is None
+        self.name = self._block.name
+        self.capacity = capacity
+        self._header = np.ndarray((2,), dtype=np.int64, buffer=self._block.buf)
+        self.rows = np.ndarray((capacity,), dtype=self.ROW, buffer=self._block.buf, offset=self.HEADER_BYTES)
+        if self.owner:
+            self._header[:] = 0
+            self.rows['seq'] = -1
+        self.position = self.write_count()
+        self.lapped = 0
+        self._last_read = (self.position, 0)
+
+    def write_count(self):
+        return int(self._header[0])
+
+    def write(self, frame, sampled_at):
+        count = int(self._header[0])
+        i = count % self.capacity
+        rows = self.rows
+        rows['seq'][i] = -1
+        rows['device'][i] = frame.device
+        rows['sampled_at'][i] = sampled_at
+        rows['elapsed'][i] = np.nan if frame.elapsed is None else frame.elapsed
+        temps = rows['temps'][i]
+        temps[:] = np.nan
+        for index, temp_c in frame.readings:
+            if temp_c is not None and index < RING_CHANNELS:
+                temps[index] = temp_c
+        rows['seq'][i] = count
+        self._header[0] = count + 1
+
+    def read(self):
+        # Rows written since the last read, as a view into the ring: up to the end of the
+        # buffer, so call again while it returns rows. Frames the reader fell more than a ring
+        # behind on are skipped and counted in lapped.
+        count = self.write_count()
+        if count - self.position > self.capacity:
+            self.lapped += count - self.capacity - self.position
+            self.position = count - self.capacity
+        start = self.position % self.capacity
+        n = min(count - self.position, self.capacity - start)
+        self._last_read = (self.position, n)
+        self.position += n
+        return self.rows[start:start + n]
+
+    def intact(self):
+        # Whether the writer has left the rows of the last read() alone; check after using them
+        first, n = self._last_read
+        if n and not np.array_equal(self.rows['seq'][first % self.capacity:first % self.capacity + n], np.arange(first, first + n)):
+            self.lapped += n
+            return False
+        return True
+
+    def close(self):
+        self.rows = None
+        self._header = None
+        self._block.close()
+        if self.owner:
+            self._block.unlink()
+
+class AcquisitionCore:
+    # Owns the TURTLE boxes, the consumer thread that records every frame, and the subscriber
+    # fan-out. Nothing here touches Qt: the desktop app and TURTLE_Daemon.py both drive it.
+    # With shared_ring, frames are also published to a FrameRing for worker processes. A box that
+    # is unplugged or stops sending is reconnected by _monitor() and its outage marked as a gap.
+    def __init__(self, ports=None, binary=USE_BINARY_PROTOCOL, recordings_dir=RECORDINGS_DIR, shared_ring=False):
+        self.port_override = ports
+        self.binary = binary
+        self.recordings_dir = recordings_dir
+        self.acquisition = AcquisitionManager()
+        self.serial_ports = []
+        self.connected = False
+        # Last RATE:/TYPE:/AVG: command sent, so the box configuration can be restored
+        self.config = {}
+        self.rate_meter = RateMeter()
+        self.stats = AcquisitionStats()
+
+        self.samples = SampleStore(max_per_channel=MAX_SAMPLES_IN_MEMORY)
+        self.is_recording = False
+        self.start_time = None
+        self.start_clock = None
+        self.recording_log = None
+        self.recording_path = None
+        self.archive_writer = None
+        self.loaded_recording = None
+        # (device, start, end) of the outages marked in the current recording
+        self.gaps = []
+        # Global channels whose box and local T the current recording has stored
+        self._mapped_channels = 0
+        # Held by the consumer while it records a frame, so starting and stopping (by hand or by
+        # a trigger) never lands in the middle of one
+        self._recording_lock = RLock()
+
+        # Triggered recording, see arm()
+        self.start_trigger = None
+        self.stop_trigger = None
+        self.armed = False
+        self.pre_trigger = 0.0
+        self._history = deque(maxlen=PRE_TRIGGER_MAX_FRAMES)
+
+        self._subscriptions = []
+        self._subscriptions_lock = Lock()
+        self._consumer = None
+        self.shared_ring = shared_ring
+        self.frame_ring = None
+
+        # Boxes whose port is lost, {device: LinkEvent of the outage}; see _monitor()
+        self.lost_links = {}
+        self._monitor_thread = None
+        self._closing = Event()
+
+    def connect(self):
+        # Open and negotiate every TURTLE port; returns a list of error messages
+        ports = list(self.port_override) if self.port_override else find_arduino_ports()
+        if not ports:
+            return ["Arduino not found"]
+        errors = []
+        opened = []
+        for port in ports:
+            try:
+                opened.append(serial.Serial(port, ASCII_BAUD, timeout=1))
+            except Exception as e:
+                errors.append(f"Failed to connect to Arduino on {port}: {e}")
+
+        # Negotiate every box at once so startup waits for one board reset, not N
+        if self.binary and opened:
+            with ThreadPoolExecutor(max_workers=len(opened)) as pool:
+                binary_modes = list(pool.map(negotiate_binary_protocol, opened))
+        else:
+            binary_modes = [False] * len(opened)
+        for ser, binary in zip(opened, binary_modes):
+            self.serial_ports.append(ser)
+            self.acquisition.add_device(ser, binary=binary)
+        if self.serial_ports:
+            self.connected = True
+            errors += self.send("TYPE:T;")
+            errors += self.send("RATE:1;")
+        return errors
+
+    def send(self, message):
+        # Settings apply to every connected box; returns a list of error messages
+        command = message.split(":", 1)[0]
+        if command == "RATEMS":
+            command = "RATE"
+        if command in ("RATE", "TYPE", "AVG"):
+            self.config[command] = message
+        if command == "RATE":
+            self.stats.rate_changed(command_interval(message))
+        errors = []
+        for device, ser in enumerate(self.serial_ports):
+            if device in self.lost_links:
+                continue  # sent with the rest of self.config once it is back
+            try:
+                ser.write(message.encode())
+            except Exception as e:
+                errors.append(f"Error sending data to Arduino on {ser.port}. Error: {e}")
+        return errors
+
+    def start(self):
+        if not self.connected:
+            return
+        if self.shared_ring and self.frame_ring is None:
+            self.frame_ring = FrameRing()
+        self._closing.clear()
+        self.acquisition.start()
+        self._consumer = Thread(target=self._consume, daemon=True)
+        self._consumer.start()
+        self._monitor_thread = Thread(target=self._monitor, daemon=True)
+        self._monitor_thread.start()
+
+    def close(self):
+        self.stop_recording()
+        self._closing.set()
+        if self._monitor_thread is not None:
+            self._monitor_thread.join(timeout=10)  # may be waiting out a box's reboot
+            self._monitor_thread = None
+        self.acquisition.stop()
+        frame_ring = self.frame_ring
+        if frame_ring is not None:
+            # The consumer may still be writing its last frame into the ring
+            if self._consumer is not None:
+                self._consumer.join(timeout=2)
+            self.frame_ring = None
+            frame_ring.close()
+        for engine in self.acquisition.engines:
+            if engine.binary and engine.device not in self.lost_links:
+                # Leave the box on the text protocol for the next connection
+                try:
+                    engine.ser.write(b"PROTO:ASCII;")
+                    engine.ser.flush()
+                except Exception:
+                    pass
+        for ser in self.serial_ports:
+            ser.close()
+
+    def channel_title(self, index):
+        return self.acquisition.channel_title(index)
+
+    def effective_rates(self):
+        # {device: frames per second actually received}
+        return self.rate_meter.rates(perf_counter())
+
+    def metrics(self):
+        # Snapshot of the acquisition counters for the status bar and the recording's sidecar
+        rates = self.effective_rates()
+        devices = []
+        for engine in self.acquisition.engines:
+            device = engine.device
+            devices.append({
+                'port': engine.ser.port,
+                'protocol': 'binary' if engine.binary else 'ascii',
+                'rate_hz': round(rates.get(device, 0.0), 3),
+                'frames': self.stats.frames.get(device, 0),
+                'malformed': engine.malformed_frames + (engine.decoder.crc_errors if engine.decoder else 0),
+                'lost_frames': engine.lost_frames,
+                'dropped_frames': engine.dropped_frames,
+                'gaps': self.stats.gaps.get(device, 0),
+                'clock_drift_ppm': round(engine.clock.drift_ppm, 1) if engine.binary else None,
+                'backlog_bytes': engine.backlog.snapshot(),
+                'connected': device not in self.lost_links,
+                'disconnects': engine.disconnects,
+                'downtime_s': round(engine.downtime, 3),
+                'error': engine.error,
+            })
+        return {
+            'recording': self.recording_path,
+            'devices': devices,
+            'consumer_latency_ms': self.stats.consumer_latency.snapshot(),
+            'display_latency_ms': self.stats.display_latency.snapshot(),
+            'subscriber_drops': sum(subscription.dropped for subscription in self._subscriptions),
+            'exports': list(self.stats.exports),
+            'link_gaps': [list(gap) for gap in self.gaps],
+        }
+
+    def save_metrics(self):
+        # Write the metrics next to the recording log; returns an error message on failure
+        if not self.recording_path:
+            return None
+        try:
+            write_metrics(metrics_path(self.recording_path), self.metrics())
+        except OSError as e:
+            return f"Could not save acquisition metrics. Error: {e}"
+        return None
+
+    def subscribe(self, max_items=1024):
+        subscription = Subscription(max_items)
+        with self._subscriptions_lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._subscriptions_lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def _publish(self, item):
+        for subscription in self._subscriptions:
+            subscription.put(item)
+
+    def _publish_frame(self, frame, sampled_at):
+        self._publish(frame)
+        frame_ring = self.frame_ring
+        if frame_ring is not None:
+            frame_ring.write(frame, sampled_at)
+
+    def _monitor(self):
+        # Watches every box's port: one that fails or stays silent for too long is closed and
+        # reopened with exponential backoff, then gets the settings in self.config again.
+        # LinkEvents go through the frame queue, so the consumer sees them in order with the frames.
+        acquisition = self.acquisition
+        retry_at = {}
+        while not self._closing.wait(MONITOR_INTERVAL):
+            for engine in acquisition.engines:
+                device = engine.device
+                now = perf_counter()
+                lost = self.lost_links.get(device)
+                if lost is None:
+                    interval = command_interval(self.config.get('RATE', "RATE:1;")) or 1.0
+                    silent = now - engine.last_data_at
+                    if engine.is_running() and silent <= max(STALE_TIMEOUT, STALE_INTERVALS * interval):
+                        continue
+                    if engine.error is None:
+                        engine.error = f"no data for {silent:.0f} s"
+                    engine.stop()
+                    try:
+                        engine.ser.close()
+                    except Exception:
+                        pass
+                    engine.disconnects += 1
+                    lost = LinkEvent(device, acquisition.ports[device], False, engine.last_data_at, now, 0, engine.error)
+                    self.lost_links[device] = lost
+                    retry_at[device] = now + RECONNECT_BACKOFF[0]
+                    put_dropping_oldest(acquisition.frames, lost)
+                    continue
+                if now < retry_at[device]:
+                    continue
+                ser, binary, error = self._reopen(device, lost.port)
+                if self._closing.is_set():
+                    if ser is not None:
+                        ser.close()
+                    return
+                now = perf_counter()
+                if ser is None:
+                    lost = lost._replace(at=now, attempts=lost.attempts + 1, error=error)
+                    self.lost_links[device] = lost
+                    retry_at[device] = now + min(RECONNECT_BACKOFF[0] * 2 ** lost.attempts, RECONNECT_BACKOFF[1])
+                    put_dropping_oldest(acquisition.frames, lost)
+                    continue
+                self.serial_ports[device] = ser
+                acquisition.ports[device] = ser.port
+                engine.downtime += now - lost.since
+                engine.reopen(ser, binary)
+                del self.lost_links[device]
+                put_dropping_oldest(acquisition.frames, lost._replace(port=ser.port, connected=True, at=now, error=None))
+
+    def _reopen(self, device, port):
+        # Returns (serial port, binary, None) or (None, False, error message). Without a --port
+        # override the box may come back under another name, e.g. /dev/ttyUSB1.
+        candidates = [port]
+        if not self.port_override:
+            in_use = {ser.port for other, ser in enumerate(self.serial_ports) if other != device}
+            candidates += [name for name in find_arduino_ports() if name != port and name not in in_use]
+        error = None
+        for candidate in candidates:
+            try:
+                ser = serial.Serial(candidate, ASCII_BAUD, timeout=1)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                continue
+            try:
+                binary = self.binary and negotiate_binary_protocol(ser)
+                # The box rebooted with its defaults. Sent back to back, so each command needs
+                # its terminator (the firmware otherwise ends one on a read timeout).
+                for message in self.config.values():
+                    ser.write((message if message.endswith(";") else message + ";").encode())
+                return ser, binary, None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                ser.close()
+        return None, False, error
+
+    def _link_event(self, event):
+        # Called by the consumer. A restored link marks the outage as a gap in the recording.
+        if event.connected:
+            self.stats.link_restored(event.device)
+            with self._recording_lock:
+                if self.is_recording:
+                    event = event._replace(gap=self._mark_gap(event.device, event.since, event.at))
+        self._publish(event)
+
+    def _mark_gap(self, device, since, until):
+        # The part of an outage that falls in the recording, in recording timestamps
+        start = round(max(since, self.start_clock) - self.start_clock, 3)
+        end = round(until - self.start_clock, 3)
+        for writer in (self.recording_log, self.archive_writer):
+            if writer is not None:
+                writer.mark_gap(device, start, end)
+        self.gaps.append((device, start, end))
+        return start, end
+
+    def _consume(self):
+        # Single consumer for every device; frames from all ports share one recording timeline
+        acquisition = self.acquisition
+        while not self._closing.is_set() or not acquisition.frames.empty():
+            try:
+                item = acquisition.frames.get(timeout=1)
+            except Empty:
+                continue
+            if isinstance(item, LinkEvent):
+                self._link_event(item)
+                continue
+            frame = acquisition.global_frame(item)
+            sampled_at = frame.sampled_at if frame.sampled_at is not None else frame.received_at
+            self.rate_meter.tick(frame.device, sampled_at)
+            self.stats.frame_consumed(frame.device, sampled_at, (perf_counter() - frame.received_at) * 1000)
+            with self._recording_lock:
+                started, stopped = self._check_triggers(frame, sampled_at)
+                if started:
+                    self.start_recording(trigger=self.start_trigger, at=sampled_at)
+                if self.is_recording:
+                    frame = self._record(frame, sampled_at)
+                elif self.pre_trigger > 0:
+                    self._remember(frame, sampled_at)
+            self._publish_frame(frame, sampled_at)
+            if stopped:
+                self.stop_recording(trigger=self.stop_trigger)
+
+    def _record(self, frame, sampled_at):
+        # Every reading of a frame shares the frame's sample time, on a monotonic clock
+        elapsed_time = round(sampled_at - self.start_clock, 3)
+        for index, temp_c in frame.readings:
+            if temp_c is not None:
+                self.samples.append(index + 1, elapsed_time, temp_c)
+        if len(self.acquisition.channel_sources) > self._mapped_channels:
+            self._map_channels()
+        recording_log = self.recording_log
+        if recording_log is not None:
+            recording_log.write(elapsed_time, frame)
+        archive_writer = self.archive_writer
+        if archive_writer is not None:
+            for index, temp_c in frame.readings:
+                if temp_c is not None:
+                    archive_writer.append(index + 1, elapsed_time, temp_c)
+        return frame._replace(elapsed=elapsed_time)
+
+    def _map_channels(self):
+        # Global numbering follows the order channels were first seen, so store which box and
+        # local T every new channel is before its first reading is written
+        recording_log, archive_writer = self.recording_log, self.archive_writer
+        sources = self.acquisition.channel_sources
+        for index in range(self._mapped_channels, len(sources)):
+            device, local_index = sources[index]
+            port = self.acquisition.ports[device]
+            if recording_log is not None:
+                recording_log.map_channel(index + 1, port, local_index + 1)
+            if archive_writer is not None:
+                archive_writer.map_channel(index + 1, port, local_index + 1)
+        self._mapped_channels = len(sources)
+
+    def _remember(self, frame, sampled_at):
+        history = self._history
+        history.append((frame, sampled_at))
+        while sampled_at - history[0][1] > self.pre_trigger:
+            history.popleft()
+
+    def _check_triggers(self, frame, sampled_at):
+        # Both triggers see every reading, armed or not, so a rate window is already full when
+        # it is needed. Returns whether to start and whether to stop recording.
+        start_trigger, stop_trigger = self.start_trigger, self.stop_trigger
+        if start_trigger is None and stop_trigger is None:
+            return False, False
+        started = stopped = False
+        for index, temp_c in frame.readings:
+            if temp_c is None:
+                continue
+            if start_trigger is not None and start_trigger.update(index + 1, sampled_at, temp_c):
+                started = True
+            if stop_trigger is not None and stop_trigger.update(index + 1, sampled_at, temp_c):
+                stopped = True
+        if started and self.armed and not self.is_recording:
+            self.armed = False  # one run per arming
+            return True, False
+        return False, stopped and self.is_recording
+
+    def arm(self, start=None, stop=None, pre_trigger=0.0):
+        # start and stop are RecordingTriggers (or None for by hand). The start trigger fires
+        # once; the stop trigger ends any recording until disarm(). pre_trigger seconds of
+        # frames before the start, triggered or not, are kept and saved with the run.
+        with self._recording_lock:
+            self.start_trigger = start
+            self.stop_trigger = stop
+            self.armed = start is not None
+            self.pre_trigger = max(float(pre_trigger), 0.0)
+            if not self.pre_trigger:
+                self._history.clear()
+
+    def disarm(self):
+        with self._recording_lock:
+            self.start_trigger = None
+            self.stop_trigger = None
+            self.armed = False
+
+    def start_recording(self, trigger=None, at=None):
+        # Returns an error message if the on-disk log could not be created; the recording then
+        # only lives in memory. at is the perf_counter() time the run starts from (now by default).
+        with self._recording_lock:
+            return self._start_recording(trigger, perf_counter() if at is None else at)
+
+    def _start_recording(self, trigger, at):
+        error = None
+        self.samples.clear()
+        self.gaps = []
+        self._mapped_channels = 0
+        try:
+            self.recording_log = self._create_recording_log()
+            self.recording_path = self.recording_log.path
+        except OSError as e:
+            self.recording_log = None
+            self.recording_path = None
+            error = f"Could not create a recording log, data will only be kept in memory. Error: {e}"
+        # The indexed copy that past sessions are reopened from; the log stays the safe record
+        self.archive_writer = None
+        if self.recording_path:
+            try:
+                self.archive_writer = ArchiveWriter(archive_path(self.recording_path),
+                                                    source=os.path.basename(self.recording_path))
+            except OSError:
+                pass
+        self._map_channels()
+        # Wall clock, for display; timestamps use start_clock
+        self.start_time = current_time() - (perf_counter() - at)
+        self.start_clock = at
+        self.is_recording = True
+        self._publish(RecordingEvent(True, self.start_time, self.recording_path, trigger and trigger.describe()))
+        # The pre-trigger history becomes the start of the run, at negative timestamps. It was
+        # already shown live, so it is marked replayed and left out of latency and rate metrics.
+        history, self._history = self._history, deque(maxlen=PRE_TRIGGER_MAX_FRAMES)
+        for frame, sampled_at in history:
+            if at - sampled_at <= self.pre_trigger:
+                self._publish_frame(self._record(frame, sampled_at)._replace(replayed=True), sampled_at)
+        return error
+
+    def _create_recording_log(self):
+        # Names only go down to the second, so a run started in the same second as the last one
+        # gets a _2, _3, ... suffix instead of overwriting it. A name whose archive is still
+        # there is skipped too, so the log and archive always share a stem.
+        os.makedirs(self.recordings_dir, exist_ok=True)
+        stem = os.path.join(self.recordings_dir, f"TURTLE_Data_{datetime.now().strftime('%m-%d-%y_%H-%M-%S')}")
+        path = stem + ".csv"
+        attempt = 1
+        while True:
+            if not os.path.exists(archive_path(path)):
+                try:
+                    return RecordingLog(path, channels=len(self.acquisition.channel_sources))
+                except FileExistsError:
+                    pass
+            attempt += 1
+            path = f"{stem}_{attempt}.csv"
+
+    def stop_recording(self, trigger=None):
+        with self._recording_lock:
+            if not self.is_recording:
+                return
+            # A box still disconnected is missing up to the end of the run
+            now = perf_counter()
+            for lost in list(self.lost_links.values()):
+                self._mark_gap(lost.device, lost.since, now)
+            self.is_recording = False
+            recording_log = self.recording_log
+            self.recording_log = None
+            archive_writer = self.archive_writer
+            self.archive_writer = None
+        # The log is finished first, so the archive records its final size and mtime
+        if recording_log is not None:
+            recording_log.close()
+        if archive_writer is not None:
+            archive_writer.close()
+        if recording_log is not None:
+            self.save_metrics()
+        self._publish(RecordingEvent(False, self.start_time, self.recording_path, trigger and trigger.describe()))
+
+    def recorded_samples(self):
+        # Once the in-memory buffer has been trimmed, the complete run is read from its archive
+        path = archive_path(self.recording_path) if self.recording_path else None
+        if self.samples.dropped and path and os.path.isdir(path):
+            archive_writer = self.archive_writer
+            if archive_writer is not None:
+                archive_writer.flush()
+            archive = RecordingArchive(path)
+            if self.loaded_recording is None or self.loaded_recording.version != archive.version:
+                self.loaded_recording = archive
+            return self.loaded_recording
+        return self.samples
+
+def encode_stream_item(item, dropped=0):
+    # One JSON line per frame or event; channel ids on the wire are 1-based like in recordings
+    if isinstance(item, RecordingEvent):
+        message = {
+            'type': 'recording',
+            'recording': item.recording,
+            'start_time': item.start_time,
+            'path': item.path,
+            'trigger': item.trigger
+        }
+    elif isinstance(item, LinkEvent):
+        # perf_counter() times mean nothing to another process; send the outage's length instead
+        message = {
+            'type': 'link',
+            'device': item.device,
+            'port': item.port,
+            'connected': item.connected,
+            'down_for': round(item.at - item.since, 3),
+            'attempts': item.attempts,
+            'error': item.error,
+            'gap': item.gap
+        }
+    else:
+        message = {
+            'type': 'frame',
+            'device': item.device,
+            'seq': item.seq,
+            'device_ms': item.device_ms,
+            'elapsed': item.elapsed,
+            'readings': [[index + 1, temp_c] for index, temp_c in item.readings],
+            'replayed': item.replayed,
+            'dropped': dropped
+        }
+    return (json.dumps(message) + "\n").encode()
+
+class StreamServer:
+    # Serves an AcquisitionCore to local TCP clients as JSON lines. Each client gets its own
+    # Subscription and sender thread, so a stalled client only backs up (and drops from) its own
+    # buffer. Clients may send {"cmd": "send", "message": "RATE:1;"}, {"cmd": "start_recording"},
+    # {"cmd": "stop_recording"}, {"cmd": "arm", "start": "T1:temp<-50", "stop": null,
+    # "pre_trigger": 30} or {"cmd": "disarm"}. Only STREAM_SEND_COMMANDS may be sent to the boxes.
+    def __init__(self, core, host=STREAM_HOST, port=STREAM_PORT, max_items=1024):
+        self.core = core
+        self.address = (host, port)
+        self.max_items = max_items
+        self._server = None
+        self._stop_event = Event()
+
+    def start(self):
+        self._server = socket.create_server(self.address)
+        self._server.settimeout(1)
+        self.address = self._server.getsockname()
+        Thread(target=self._accept, daemon=True).start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.close()
+
+    def _accept(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _hello(self):
+        channels = [self.core.channel_title(i) for i in range(len(self.core.acquisition.channel_sources))]
+        message = {
+            'type': 'hello',
+            'connected': self.core.connected,
+            'recording': self.core.is_recording,
+            'start_time': self.core.start_time,
+            'path': self.core.recording_path,
+            'armed': self.core.armed,
+            'channels': channels
+        }
+        return (json.dumps(message) + "\n").encode()
+
+    def _serve(self, conn):
+        subscription = self.core.subscribe(self.max_items)
+        Thread(target=self._receive, args=(conn,), daemon=True).start()
+        channel_count = len(self.core.acquisition.channel_sources)
+        try:
+            conn.sendall(self._hello())
+            while not self._stop_event.is_set():
+                try:
+                    item = subscription.get(timeout=1)
+                except Empty:
+                    continue
+                if len(self.core.acquisition.channel_sources) != channel_count:
+                    channel_count = len(self.core.acquisition.channel_sources)
+                    conn.sendall(self._hello())
+                conn.sendall(encode_stream_item(item, subscription.dropped))
+        except OSError:
+            pass  # client went away
+        finally:
+            self.core.unsubscribe(subscription)
+            conn.close()
+
+    def _receive(self, conn):
+        try:
+            for line in conn.makefile('rb'):
+                try:
+                    command = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(command, dict):
+                    continue
+                if command.get('cmd') == 'send':
+                    message = str(command.get('message', ''))
+                    parts = [part for part in message.split(';') if part.strip()]
+                    if parts and all(part.strip().startswith(STREAM_SEND_COMMANDS) for part in parts):
+                        self.core.send(message)
+                elif command.get('cmd') == 'start_recording':
+                    if not self.core.is_recording:
+                        self.core.start_recording()
+                elif command.get('cmd') == 'stop_recording':
+                    self.core.stop_recording()
+                elif command.get('cmd') == 'arm':
+                    try:
+                        start, stop = (
+                            RecordingTrigger.parse(command[key], command.get('window', RATE_WINDOW)) if command.get(key) else None
+                            for key in ('start', 'stop')
+                        )
+                        self.core.arm(start, stop, command.get('pre_trigger', 0.0))
+                    except (ValueError, TypeError):
+                        continue
+                elif command.get('cmd') == 'disarm':
+                    self.core.disarm()
+        except OSError:
+            pass
+
+class RemoteCore:
+    # Client of a StreamServer with the AcquisitionCore interface the desktop app uses. It keeps
+    # a local mirror of the recording, so graphing and export work the same as in-process.
+    def __init__(self, host=STREAM_HOST, port=STREAM_PORT):
+        self.address = (host, port)
+        self.connected = False
+        self.samples = SampleStore(max_per_channel=MAX_SAMPLES_IN_MEMORY)
+        self.is_recording = False
+        self.start_time = None
+        self.recording_path = None
+        self.armed = False
+        self.channel_titles = []
+        self.rate_meter = RateMeter()
+        self.stats = AcquisitionStats()
+        self._socket = None
+        self._send_lock = Lock()
+        self._subscriptions = []
+
+    def connect(self):
+        try:
+            self._socket = socket.create_connection(self.address, timeout=5)
+            self._socket.settimeout(None)
+        except OSError as e:
+            return [f"Could not reach the TURTLE daemon at {self.address[0]}:{self.address[1]}: {e}"]
+        self.connected = True
+        return []
+
+    def start(self):
+        if self.connected:
+            Thread(target=self._receive, daemon=True).start()
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+
+    def _command(self, message):
+        try:
+            with self._send_lock:
+                self._socket.sendall((json.dumps(message) + "\n").encode())
+            return []
+        except OSError as e:
+            return [f"Lost connection to the TURTLE daemon: {e}"]
+
+    def send(self, message):
+        if message.startswith(("RATE:", "RATEMS:")):
+            self.stats.rate_changed(command_interval(message))
+        return self._command({'cmd': 'send', 'message': message})
+
+    def start_recording(self):
+        errors = self._command({'cmd': 'start_recording'})
+        return errors[0] if errors else None
+
+    def stop_recording(self):
+        self._command({'cmd': 'stop_recording'})
+
+    def arm(self, start=None, stop=None, pre_trigger=0.0):
+        # Triggers travel as their spec strings; the daemon evaluates them on its own frames
+        window = next((trigger.window for trigger in (start, stop) if trigger is not None), RATE_WINDOW)
+        errors = self._command({
+            'cmd': 'arm',
+            'start': str(start) if start is not None else None,
+            'stop': str(stop) if stop is not None else None,
+            'pre_trigger': pre_trigger,
+            'window': window
+        })
+        if not errors:
+            self.armed = start is not None
+        return errors
+
+    def disarm(self):
+        self.armed = False
+        return self._command({'cmd': 'disarm'})
+
+    def channel_title(self, index):
+        if index < len(self.channel_titles):
+            return self.channel_titles[index]
+        return f"Thermocouple {index+1}:"
+
+    def effective_rates(self):
+        # Measured from arrival times, which include the network hop
+        return self.rate_meter.rates(perf_counter())
+
+    def metrics(self):
+        # Only what this client sees; the serial-side counters live in the daemon
+        rates = self.effective_rates()
+        devices = [
+            {'rate_hz': round(rates.get(device, 0.0), 3), 'frames': frames, 'gaps': self.stats.gaps.get(device, 0)}
+            for device, frames in sorted(self.stats.frames.items())
+        ]
+        return {
+            'recording': self.recording_path,
+            'devices': devices,
+            'consumer_latency_ms': self.stats.consumer_latency.snapshot(),
+            'display_latency_ms': self.stats.display_latency.snapshot(),
+            'subscriber_drops': sum(subscription.dropped for subscription in self._subscriptions),
+            'exports': list(self.stats.exports),
+        }
+
+    def save_metrics(self):
+        return None  # the daemon writes the recording's metrics
+
+    def subscribe(self, max_items=1024):
+        subscription = Subscription(max_items)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.remove(subscription)
+
+    def recorded_samples(self):
+        return self.samples
+
+    def _receive(self):
+        try:
+            for line in self._socket.makefile('rb'):
+                message = json.loads(line)
+                item = None
+                if message['type'] == 'hello':
+                    self.channel_titles = message['channels']
+                    self.armed = message.get('armed', False)
+                    if message['recording'] and not self.is_recording:
+                        self.is_recording = True
+                        self.start_time = message['start_time']
+                        self.recording_path = message['path']
+                elif message['type'] == 'recording':
+                    if message['recording']:
+                        self.samples.clear()
+                        if message.get('trigger'):
+                            self.armed = False
+                    self.is_recording = message['recording']
+                    self.start_time = message['start_time']
+                    self.recording_path = message['path']
+                    item = RecordingEvent(message['recording'], message['start_time'], message['path'], message.get('trigger'))
+                elif message['type'] == 'link':
+                    at = perf_counter()
+                    gap = tuple(message['gap']) if message['gap'] else None
+                    item = LinkEvent(message['device'], message['port'], message['connected'], at - message['down_for'], at,
+                                     message['attempts'], message['error'], gap)
+                elif message['type'] == 'frame':
+                    received_at = perf_counter()
+                    replayed = message.get('replayed', False)
+                    if not replayed:
+                        self.rate_meter.tick(message['device'], received_at)
+                        self.stats.frame_consumed(message['device'], received_at)
+                    readings = [(tc_id - 1, temp_c) for tc_id, temp_c in message['readings']]
+                    elapsed = message['elapsed']
+                    if elapsed is not None:
+                        for index, temp_c in readings:
+                            if temp_c is not None:
+                                self.samples.append(index + 1, elapsed, temp_c)
+                    item = Frame(received_at, message['device'], readings, message['seq'], message['device_ms'], elapsed,
+                                 replayed=replayed)
+                if item is not None:
+                    for subscription in self._subscriptions:
+                        subscription.put(item)
+        except (OSError, ValueError):
+            pass
+        self.connected = False
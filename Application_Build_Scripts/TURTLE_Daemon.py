@@ -0,0 +1,109 @@
+# Headless TURTLE logger: runs the acquisition core without a desktop session and streams every
+# frame to local clients (see StreamServer in TURTLE_Core.py).
+#
+#   python TURTLE_Daemon.py --record --rate 1 --type T
+#   python TURTLE_Daemon.py --rate 0.1 --start-when 'T1:rate<-5' --stop-when 'T1:temp<-150' --pre-trigger 30
+#   python TURTLE_AppV3.6.3.py --connect          # watch it live from the desktop app
+#
+# Each client connection receives JSON lines: one "hello" with the channel list, then "frame"
+# and "recording" messages; it can send {"cmd": "start_recording"} and the like back.
+
+import sys
+import time
+import signal
+import argparse
+
+from TURTLE_Core import (
+    AcquisitionCore, StreamServer, RecordingTrigger, LinkEvent, rate_command, metrics_summary, metrics_path,
+    RECORDINGS_DIR, RATE_WINDOW, STREAM_HOST, STREAM_PORT
+)
+
+def link_message(event):
+    if event.connected:
+        gap = f", marked as a gap from {event.gap[0]} s to {event.gap[1]} s" if event.gap else ""
+        return f"Reconnected to {event.port} after {event.at - event.since:.1f} s{gap}"
+    if event.attempts:
+        return f"Reconnecting to {event.port} failed (attempt {event.attempts}): {event.error}"
+    return f"Lost {event.port}: {event.error}. Reconnecting"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless TURTLE acquisition daemon.")
+    parser.add_argument('--port', action='append', help="serial port to use instead of auto-detection (repeatable)")
+    parser.add_argument('--listen', default=f"{STREAM_HOST}:{STREAM_PORT}", metavar='HOST:PORT',
+                        help=f"address of the local stream (default {STREAM_HOST}:{STREAM_PORT})")
+    parser.add_argument('--rate', type=float, help="seconds between samples, e.g. 0.2 for 5 Hz; at most one per conversion (0.1 s), 0 for every conversion")
+    parser.add_argument('--average', type=int, choices=[1, 2, 4, 8, 16], help="average this many conversions on the box")
+    parser.add_argument('--type', choices=list("KJTENSRB"), help="thermocouple type")
+    parser.add_argument('--record', action='store_true', help="start recording immediately")
+    parser.add_argument('--start-when', metavar='CONDITION',
+                        help="start recording once a reading meets CONDITION: [T<n>:](temp|rate)(<|>)VALUE, "
+                             "temp in °C, rate in °C/min (negative while cooling), e.g. 'T1:rate<-5'")
+    parser.add_argument('--stop-when', metavar='CONDITION', help="stop recording once a reading meets CONDITION")
+    parser.add_argument('--pre-trigger', type=float, default=0.0, metavar='SECONDS',
+                        help="keep this many seconds before the start in the recording")
+    parser.add_argument('--rate-window', type=float, default=RATE_WINDOW, metavar='SECONDS',
+                        help=f"seconds of readings a rate condition is fitted over (default {RATE_WINDOW:g})")
+    parser.add_argument('--recordings-dir', default=RECORDINGS_DIR)
+    parser.add_argument('--ascii', action='store_true', help="don't negotiate the binary protocol")
+    args = parser.parse_args(argv)
+    try:
+        start_trigger, stop_trigger = (
+            RecordingTrigger.parse(spec, args.rate_window) if spec else None for spec in (args.start_when, args.stop_when)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    core = AcquisitionCore(ports=args.port, binary=not args.ascii, recordings_dir=args.recordings_dir)
+    for error in core.connect():
+        print(error, file=sys.stderr)
+    if not core.connected:
+        return 1
+    if args.type:
+        core.send(f"TYPE:{args.type};")
+    if args.rate is not None:
+        core.send(rate_command(args.rate))
+    if args.average:
+        core.send(f"AVG:{args.average};")
+
+    # Only for reporting lost and restored ports; frames are dropped from it unread
+    events = core.subscribe(max_items=256)
+
+    host, _, port = args.listen.rpartition(':')
+    server = StreamServer(core, host or STREAM_HOST, int(port))
+    server.start()
+    core.start()
+    print(f"Streaming {len(core.serial_ports)} device(s) on {server.address[0]}:{server.address[1]}", file=sys.stderr)
+
+    if start_trigger or stop_trigger or args.pre_trigger:
+        core.arm(start_trigger, stop_trigger, args.pre_trigger)
+    if start_trigger:
+        print(f"Waiting for {start_trigger.describe()}", file=sys.stderr)
+    if args.record:
+        error = core.start_recording()
+        print(error or f"Recording to {core.recording_path}", file=sys.stderr)
+
+    # Stop cleanly on Ctrl+C or a service manager's SIGTERM so the log gets its footer. A box
+    # that is unplugged is reconnected by the core, so the daemon keeps running until stopped.
+    stopping = []
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    was_recording = core.is_recording
+    while not stopping:
+        time.sleep(0.5)
+        for event in events.drain():
+            if isinstance(event, LinkEvent):
+                print(link_message(event), file=sys.stderr)
+        if core.is_recording != was_recording:
+            was_recording = core.is_recording
+            print(f"Recording to {core.recording_path}" if was_recording else f"Recording saved to {core.recording_path}",
+                  file=sys.stderr)
+
+    server.stop()
+    core.close()
+    print(metrics_summary(core.metrics()), file=sys.stderr)
+    if core.recording_path:
+        print(f"Recording saved to {core.recording_path} (metrics in {metrics_path(core.recording_path)})", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# The "Graph" window. The app runs it in its own process, so drawing a long recording can't
+# hold the GIL the serial readers need: the recording arrives as a SharedSeries and, while it is
+# still being recorded, new frames are followed through the core's FrameRing.
+#
+#   python TURTLE_Graph.py "TURTLE Recordings/TURTLE_Data_01-02-25_10-00-00.csv"
+
+import sys
+import argparse
+
+import numpy as np
+
+from TURTLE_Core import FrameRing, SampleStore, find_archive, load_recording, minmax_decimate, RecordingArchive
+
+# Min/max buckets per line, re-read for the visible range on zoom
+GRAPH_BUCKETS = 2000
+# How often a followed recording is checked for new frames (ms)
+FOLLOW_INTERVAL_MS = 500
+
+def graph_process(shared, temp_unit, cooling_rates, ring_name=None, ring_position=None):
+    # Entry point of the app's graph process; shared is a SharedSeries
+    show_graph_window(shared.series(), temp_unit, cooling_rates, ring_name, ring_position)
+
+def show_graph_window(series, temp_unit, cooling_rates, ring_name=None, ring_position=None):
+    # series is {tc_id: (timestamps, temps)}; with ring_name the window keeps appending frames
+    # recorded after ring_position until the recording stops
+    import matplotlib.pyplot as plt
+
+    # Frames that arrive while the window is open, appended after the shared snapshot
+    tail = SampleStore()
+    last_times = {tc_id: timestamps[-1] if len(timestamps) else -np.inf for tc_id, (timestamps, _) in series.items()}
+
+    figure = plt.figure(figsize=(10, 6))
+    axes = plt.gca()
+
+    def decimated(tc_id, x_min, x_max):
+        parts = []
+        if tc_id in series:
+            parts.append(minmax_decimate(*series[tc_id], x_min, x_max, GRAPH_BUCKETS))
+        if tc_id in tail.channels():
+            parts.append(minmax_decimate(*tail.view(tc_id), x_min, x_max, GRAPH_BUCKETS))
+        return np.concatenate([x for x, _ in parts]), np.concatenate([y for _, y in parts])
+
+    # Plot the temperature data for each thermocouple, decimated to its min/max envelope
+    lines = {}
+    for tc_id in sorted(series):
+        lines[tc_id], = plt.plot(*decimated(tc_id, -np.inf, np.inf), label=f'Thermocouple {tc_id}')
+
+    # Zooming re-reads only the visible time range, at full detail once it is short enough
+    redrawing = []
+    def on_xlim_changed(axes):
+        if redrawing:
+            return
+        x_min, x_max = axes.get_xlim()
+        for tc_id, line in lines.items():
+            line.set_data(*decimated(tc_id, x_min, x_max))
+    axes.callbacks.connect('xlim_changed', on_xlim_changed)
+
+    # Add legend
+    plt.legend(loc='upper left')
+
+    # Determine the position for the cooling rate text boxes
+    xlims = plt.xlim()  # Get x-axis limits
+    ylims = plt.ylim()  # Get y-axis limits
+
+    # Place the cooling rate text boxes in the upper right corner of the plot
+    text_x = xlims[1] - 0.1 * (xlims[1] - xlims[0])  # Near the right edge
+    text_y = ylims[1] - 0.2 * (ylims[1] - ylims[0])  # Near the top, but not too close
+
+    # Display the cooling rate of each checked thermocouple
+    for tc_id, color in ((1, 'red'), (2, 'blue')):
+        data = cooling_rates.get(tc_id)
+        if data:
+            cooling_rate = data['cooling_rate']
+            interval1_temp = data['interval1_temp']
+            interval2_temp = data['interval2_temp']
+
+            textstr = f'TC {tc_id} Cooling rate: {cooling_rate:.2f}°{temp_unit}/min\n' \
+                    f'Interval: {interval1_temp:.2f}°{temp_unit} to {interval2_temp:.2f}°{temp_unit}'
+
+            plt.text(text_x, text_y, textstr, fontsize=10, color=color,
+                    verticalalignment='top', horizontalalignment='right',
+                    bbox=dict(facecolor='white', alpha=0.5))
+            text_y -= 0.1 * (ylims[1] - ylims[0])  # Adjust vertical spacing
+
+    plt.xlabel('Elapsed Time (s)')
+    plt.ylabel(f'Temperature (°{temp_unit})')
+    plt.title('Thermocouple Temperature Data')
+    plt.tight_layout()  # Adjust layout to fit text
+
+    if ring_name is not None:
+        ring = FrameRing(ring_name)
+        ring.position = ring_position
+        timer = figure.canvas.new_timer(interval=FOLLOW_INTERVAL_MS)
+        shown = [tail.version]
+
+        def follow():
+            stopped = False
+            while True:
+                rows = ring.read()
+                if not len(rows):
+                    break
+                elapsed = rows['elapsed'].copy()
+                temps = rows['temps'].copy()
+                if not ring.intact():
+                    continue  # overwritten while copying; those frames are lost to this window
+                # A frame without a recording timestamp means the recording has stopped
+                recording = ~np.isnan(elapsed)
+                if not recording.all():
+                    stopped = True
+                    end = int(np.argmin(recording))
+                    elapsed, temps = elapsed[:end], temps[:end]
+                for index in range(temps.shape[1]):
+                    tc_id = index + 1
+                    new = ~np.isnan(temps[:, index]) & (elapsed > last_times.get(tc_id, -np.inf))
+                    if new.any():
+                        tail.extend(tc_id, elapsed[new], temps[new, index])
+                        last_times[tc_id] = elapsed[new][-1]
+                if stopped:
+                    break
+            if tail.version != shown[0]:
+                shown[0] = tail.version
+                following = axes.get_autoscalex_on()
+                x_min, x_max = (-np.inf, np.inf) if following else axes.get_xlim()
+                redrawing.append(True)
+                try:
+                    for tc_id in sorted(set(series) | set(tail.channels())):
+                        line = lines.get(tc_id)
+                        if line is None:
+                            lines[tc_id], = axes.plot(*decimated(tc_id, x_min, x_max), label=f'Thermocouple {tc_id}')
+                            axes.legend(loc='upper left')
+                        else:
+                            line.set_data(*decimated(tc_id, x_min, x_max))
+                    axes.relim()
+                    axes.autoscale_view(scalex=following)
+                finally:
+                    redrawing.pop()
+                figure.canvas.draw_idle()
+            if stopped:
+                timer.stop()
+                axes.set_title('Thermocouple Temperature Data (recording stopped)')
+                figure.canvas.draw_idle()
+        timer.add_callback(follow)
+        timer.start()
+
+    plt.show()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Graph a TURTLE recording.")
+    parser.add_argument('recording', help="recording log, TURTLE_Data export or .turtle archive")
+    parser.add_argument('--unit', default='C', choices=['C', 'F'], help="temperature unit of the data")
+    args = parser.parse_args(argv)
+
+    archive = find_archive(args.recording)
+    samples = RecordingArchive(archive) if archive else load_recording(args.recording)
+    show_graph_window({tc_id: samples.view(tc_id) for tc_id in samples.channels()}, args.unit, {})
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+# Software stand-in for a TURTLE box (TURTLE_ArduinoV3.ino) on a pty-backed virtual serial port.
+# It speaks the same STATUS:/RATE:/RATEMS:/AVG:/TYPE:/PROTO: protocol, so the app can be
+# soak-tested without MAX31856 hardware. Linux/macOS only (pty); on Windows use a com0com pair
+# instead.
+#
+#   python TURTLE_Simulator.py --channels 4 --speed 100 --link /tmp/ttyTURTLE0
+#   python TURTLE_AppV3.6.3.py --port /tmp/ttyTURTLE0
+
+import os
+import sys
+import math
+import time
+import random
+import select
+import struct
+import binascii
+import argparse
+
+# Binary frame layout, identical to TemperatureFrame in TURTLE_ArduinoV3.ino
+FRAME_SYNC = b'\xaa\x55'
+FRAME_HEADER = struct.Struct('<HIBB')
+
+# The real board converts continuously every CONVERSION_INTERVAL and never sends frames faster
+# than that, so RATE:0 and shorter intervals all mean one frame per conversion
+CONVERSION_INTERVAL = 0.1
+
+class TurtleSimulator:
+    def __init__(self, channels=2, start_temp=22.0, bath_temp=-196.0, time_constant=600.0,
+                 cooldown_at=60.0, cooling_rate=None, noise=0.05, fault_rate=0.0, open_channels=(),
+                 corrupt_rate=0.0, disconnect_every=None, disconnect_for=2.0, speed=1.0,
+                 clock_drift=0.0, link=None, seed=None, verbose=False):
+        self.channels = channels
+        self.start_temp = start_temp
+        self.bath_temp = bath_temp
+        self.time_constant = time_constant
+        self.cooldown_at = cooldown_at
+        self.cooling_rate = cooling_rate
+        self.noise = noise
+        self.fault_rate = fault_rate
+        self.open_channels = set(open_channels)
+        self.corrupt_rate = corrupt_rate
+        self.disconnect_every = disconnect_every
+        self.disconnect_for = disconnect_for
+        self.speed = speed
+        self.clock_drift = clock_drift
+        self.link = link
+        self.verbose = verbose
+        self.random = random.Random(seed)
+
+        # Device state, as set by commands
+        self.interval = 1.0
+        self.tc_type = 'T'
+        self.average = 1
+        self.binary = False
+        self.seq = 0
+
+        self.master = None
+        self.port = None
+        self.frames_sent = 0
+        self._commands = b''
+
+    def open(self):
+        import pty
+        import tty
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)  # never stall on a full buffer when nobody is reading
+        self.master = master
+        self._slave = slave
+        self.port = os.ttyname(slave)
+        if self.link:
+            if os.path.lexists(self.link):
+                os.remove(self.link)
+            os.symlink(self.port, self.link)
+        # A freshly opened port resets the real board back to its defaults
+        self.interval = 1.0
+        self.binary = False
+        self._commands = b''
+        print(f"TURTLE simulator on {self.link or self.port}", file=sys.stderr, flush=True)
+
+    def close(self):
+        if self.master is not None:
+            os.close(self.master)
+            os.close(self._slave)
+            self.master = None
+
+    def log(self, message):
+        if self.verbose:
+            print(f"[sim] {message}", file=sys.stderr)
+
+    def temperature(self, channel, sim_time):
+        # Each channel starts at start_temp and, from cooldown_at, either decays exponentially
+        # toward bath_temp or falls linearly at cooling_rate °C/min; channels lag slightly
+        elapsed = sim_time - self.cooldown_at - 2.0 * channel
+        if elapsed <= 0:
+            temp = self.start_temp
+        elif self.cooling_rate is not None:
+            temp = max(self.bath_temp, self.start_temp - self.cooling_rate * elapsed / 60)
+        else:
+            temp = self.bath_temp + (self.start_temp - self.bath_temp) * math.exp(-elapsed / self.time_constant)
+        # Averaging n conversions on the board divides the noise by sqrt(n)
+        noise = self.noise / math.sqrt(self.average)
+        return temp + self.random.gauss(0.0, noise) if noise else temp
+
+    def readings(self, sim_time):
+        readings = []
+        for channel in range(self.channels):
+            is_open = channel + 1 in self.open_channels or self.random.random() < self.fault_rate
+            readings.append(None if is_open else self.temperature(channel, sim_time))
+        return readings
+
+    def encode(self, readings, sim_time):
+        if self.binary:
+            faults = sum(1 << i for i, temp in enumerate(readings) if temp is None)
+            temps = [math.nan if temp is None else temp for temp in readings]
+            # millis() runs in real time, off by the board oscillator's error, whatever the speed
+            device_ms = int(sim_time / self.speed * (1 + self.clock_drift * 1e-6) * 1000)
+            body = FRAME_HEADER.pack(self.seq & 0xFFFF, device_ms & 0xFFFFFFFF, faults, len(temps))
+            body += struct.pack(f'<{len(temps)}f', *temps)
+            data = FRAME_SYNC + body + struct.pack('<H', binascii.crc_hqx(body, 0xFFFF))
+        else:
+            fields = "".join(
+                f"T{i+1}:Not Connected," if temp is None else f"T{i+1}:{temp:.2f},"
+                for i, temp in enumerate(readings)
+            )
+            data = f"STATUS:{fields};\r\n".encode()
+        self.seq += 1
+        if self.corrupt_rate and self.random.random() < self.corrupt_rate:
+            data = self.corrupt(data)
+        return data
+
+    def corrupt(self, data):
+        data = bytearray(data)
+        if self.random.random() < 0.5:
+            data[self.random.randrange(len(data))] ^= 1 << self.random.randrange(8)
+        else:
+            del data[self.random.randrange(1, len(data)):]
+        return bytes(data)
+
+    def handle_command(self, command):
+        self.log(f"command {command!r}")
+        if command.startswith("RATE:"):
+            self.set_interval(self.to_int(command[5:]) * 1000)
+        elif command.startswith("RATEMS:"):
+            self.set_interval(self.to_int(command[7:]))
+        elif command.startswith("AVG:"):
+            self.average = min(max(self.to_int(command[4:]), 1), 16)
+        elif command.startswith("TYPE:"):
+            self.tc_type = command[5:6]
+        elif command == "PROTO:BIN":
+            os.write(self.master, b"PROTO:BIN:OK\r\n")
+            self.binary = True
+        elif command == "PROTO:ASCII":
+            self.binary = False
+
+    @staticmethod
+    def to_int(text):
+        try:
+            return int(text)
+        except ValueError:
+            return 0  # String.toInt() returns 0 for garbage
+
+    def set_interval(self, milliseconds):
+        self.interval = max(milliseconds / 1000, CONVERSION_INTERVAL)
+
+    def read_commands(self, timeout):
+        ready, _, _ = select.select([self.master], [], [], max(timeout, 0))
+        if not ready:
+            return
+        try:
+            self._commands += os.read(self.master, 1024)
+        except OSError:
+            return  # nobody has the port open
+        while b";" in self._commands:
+            command, self._commands = self._commands.split(b";", 1)
+            self.handle_command(command.decode(errors='replace').strip())
+
+    def run(self, duration=None):
+        # duration is in simulated seconds; simulated time runs `speed` times faster than real
+        self.open()
+        start = time.monotonic()
+        next_frame = 0.0
+        next_disconnect = self.disconnect_every
+        try:
+            while True:
+                sim_time = (time.monotonic() - start) * self.speed
+                if duration is not None and sim_time >= duration:
+                    break
+                if next_disconnect is not None and sim_time >= next_disconnect:
+                    self.log(f"disconnecting for {self.disconnect_for}s")
+                    self.close()
+                    time.sleep(self.disconnect_for)
+                    self.open()
+                    next_disconnect += self.disconnect_every
+                    continue
+                if sim_time >= next_frame:
+                    try:
+                        os.write(self.master, self.encode(self.readings(sim_time), sim_time))
+                        self.frames_sent += 1
+                    except OSError:
+                        pass  # output buffer full or no reader; the real board drops too
+                    next_frame += self.interval
+                    if next_frame < sim_time:
+                        next_frame = sim_time + self.interval  # fell behind, don't burst
+                self.read_commands((next_frame - sim_time) / self.speed)
+        finally:
+            self.close()
+            if self.link and os.path.islink(self.link):
+                os.remove(self.link)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a TURTLE box on a virtual serial port.")
+    parser.add_argument('--channels', type=int, default=2, help="thermocouple channels (default 2)")
+    parser.add_argument('--speed', type=float, default=1.0, help="simulated seconds per real second, e.g. 100")
+    parser.add_argument('--duration', type=float, help="stop after this many simulated seconds")
+    parser.add_argument('--start-temp', type=float, default=22.0)
+    parser.add_argument('--bath-temp', type=float, default=-196.0)
+    parser.add_argument('--time-constant', type=float, default=600.0, help="exponential cooling time constant (s)")
+    parser.add_argument('--cooling-rate', type=float, help="linear cooling in °C/min instead of exponential")
+    parser.add_argument('--cooldown-at', type=float, default=60.0, help="simulated time the cooldown starts (s)")
+    parser.add_argument('--noise', type=float, default=0.05, help="temperature noise standard deviation (°C)")
+    parser.add_argument('--fault-rate', type=float, default=0.0, help="chance per reading of an open thermocouple")
+    parser.add_argument('--open', type=int, action='append', default=[], metavar='CHANNEL', help="channel that is always open")
+    parser.add_argument('--corrupt-rate', type=float, default=0.0, help="chance per frame of a flipped bit or truncation")
+    parser.add_argument('--disconnect-every', type=float, help="drop the port every N simulated seconds")
+    parser.add_argument('--disconnect-for', type=float, default=2.0, help="real seconds the port stays gone")
+    parser.add_argument('--clock-drift', type=float, default=0.0, help="board clock error in ppm (binary timestamps)")
+    parser.add_argument('--link', help="symlink to create for the port, e.g. /tmp/ttyTURTLE0")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    simulator = TurtleSimulator(
+        channels=args.channels, start_temp=args.start_temp, bath_temp=args.bath_temp,
+        time_constant=args.time_constant, cooldown_at=args.cooldown_at, cooling_rate=args.cooling_rate,
+        noise=args.noise, fault_rate=args.fault_rate, open_channels=args.open,
+        corrupt_rate=args.corrupt_rate, disconnect_every=args.disconnect_every,
+        disconnect_for=args.disconnect_for, speed=args.speed, clock_drift=args.clock_drift,
+        link=args.link, seed=args.seed,
+        verbose=args.verbose
+    )
+    try:
+        simulator.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    print(f"sent {simulator.frames_sent} frames", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
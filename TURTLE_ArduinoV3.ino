@@ -7,19 +7,54 @@
 #define MAXCS2 9
 #define cryoLift_Address 9  // Replace with actual I2C address
 
+// Serial speeds for the text protocol and the binary protocol (enabled by "PROTO:BIN;")
+#define ASCII_BAUD 9600
+#define BINARY_BAUD 115200
+#define NUM_THERMOCOUPLES 2
+
+// The MAX31856s convert continuously, a new reading about every 100 ms with the 50/60 Hz
+// filter. Frames go out every `interval` ms (RATE:<s>; or RATEMS:<ms>;), never faster than
+// one per conversion, so every frame carries a fresh reading; RATE:0; asks for exactly that.
+// AVG:<n>; reports the mean of the last n conversions instead.
+#define CONVERSION_MS 100
+#define MAX_AVERAGE 16
+
 // Create MAX31856 instances
 Adafruit_MAX31856 max1 = Adafruit_MAX31856(MAXCS1);
 Adafruit_MAX31856 max2 = Adafruit_MAX31856(MAXCS2);
 
 unsigned long previousMillis = 0;
 unsigned long interval = 1000; // Default 1 second
+unsigned long previousConversion = 0;
+
+// Last MAX_AVERAGE conversions of each thermocouple, NAN while open
+float conversions[NUM_THERMOCOUPLES][MAX_AVERAGE];
+uint8_t conversionIndex = 0;
+uint8_t conversionCount = 0;
+uint8_t averageCount = 1;
 bool cryoLiftEnabled = false;  // Track CryoLift state
 
+// Binary frame: 0xAA 0x55, then little-endian sequence number, millis() timestamp, open
+// thermocouple fault bits (bit 0 = T1), channel count and float32 temperatures, followed by
+// a CRC-16/CCITT-FALSE of everything after the sync bytes
+struct __attribute__((packed)) TemperatureFrame {
+  uint8_t sync[2];
+  uint16_t seq;
+  uint32_t millis;
+  uint8_t faults;
+  uint8_t count;
+  float temps[NUM_THERMOCOUPLES];
+  uint16_t crc;
+};
+
+bool binaryMode = false;
+uint16_t frameSeq = 0;
+
 void setup() {
   // Cryo Lift
   Wire.begin();
 
-  Serial.begin(9600);
+  Serial.begin(ASCII_BAUD);
   max1.begin();
   max2.begin();
 
@@ -29,6 +64,10 @@ void setup() {
   max2.setNoiseFilter(MAX31856_NOISE_FILTER_60HZ);
 
   setThermocoupleType(MAX31856_TCTYPE_T); // Default to Type T
+
+  // Continuous conversion: reads return the latest result instead of waiting for a one-shot
+  max1.setConversionMode(MAX31856_CONTINUOUS);
+  max2.setConversionMode(MAX31856_CONTINUOUS);
 }
 
 void loop() {
@@ -38,12 +77,49 @@ void loop() {
   }
 
   unsigned long currentMillis = millis();
+  if (currentMillis - previousConversion >= CONVERSION_MS) {
+    previousConversion = currentMillis;
+    storeConversion();
+  }
   if (currentMillis - previousMillis >= interval) {
     previousMillis = currentMillis;
     readAndSendTemperatures();
   }
 }
 
+void storeConversion() {
+  bool open;
+  conversions[0][conversionIndex] = readTemperature(max1, open);
+  conversions[1][conversionIndex] = readTemperature(max2, open);
+  conversionIndex = (conversionIndex + 1) % MAX_AVERAGE;
+  if (conversionCount < MAX_AVERAGE) {
+    conversionCount++;
+  }
+}
+
+float averagedTemperature(uint8_t channel, bool &open) {
+  // Mean of the last averageCount conversions; open if the latest conversion was
+  float sum = 0;
+  uint8_t valid = 0;
+  uint8_t count = min(averageCount, conversionCount);
+  for (uint8_t i = 1; i <= count; i++) {
+    float temp = conversions[channel][(conversionIndex + MAX_AVERAGE - i) % MAX_AVERAGE];
+    if (i == 1 && isnan(temp)) {
+      break;
+    }
+    if (!isnan(temp)) {
+      sum += temp;
+      valid++;
+    }
+  }
+  open = valid == 0;
+  return open ? NAN : sum / valid;
+}
+
+void setInterval(long milliseconds) {
+  interval = max(milliseconds, (long)CONVERSION_MS);
+}
+
 void setThermocoupleType(uint8_t type) {
   max1.setThermocoupleType(type);
   max2.setThermocoupleType(type);
@@ -51,7 +127,11 @@ void setThermocoupleType(uint8_t type) {
 
 void handleCommand(String command) {
   if (command.startsWith("RATE:")) {
-    interval = command.substring(5).toInt() * 1000; // Convert seconds to milliseconds
+    setInterval(command.substring(5).toInt() * 1000L); // Convert seconds to milliseconds
+  } else if (command.startsWith("RATEMS:")) {
+    setInterval(command.substring(7).toInt());
+  } else if (command.startsWith("AVG:")) {
+    averageCount = constrain(command.substring(4).toInt(), 1, MAX_AVERAGE);
   } else if (command.startsWith("TYPE:")) {
     char type = command.charAt(5);
     switch (type) {
@@ -69,17 +149,37 @@ void handleCommand(String command) {
     cryoLiftEnabled = true;
   } else if (command == "Cryo:OFF") {
     cryoLiftEnabled = false;
+  } else if (command == "PROTO:BIN") {
+    // Acknowledge at the current speed, then switch; the host changes baud when it sees the reply
+    Serial.println("PROTO:BIN:OK");
+    Serial.flush();
+    Serial.begin(BINARY_BAUD);
+    binaryMode = true;
+  } else if (command == "PROTO:ASCII") {
+    Serial.flush();
+    Serial.begin(ASCII_BAUD);
+    binaryMode = false;
   }
 }
 
 void readAndSendTemperatures() {
-  Serial.print("STATUS:");
-  float temp1 = readAndReportStatus(max1, 1);
-  float temp2 = readAndReportStatus(max2, 2);
-  
-  Serial.println(";");
+  if (conversionCount == 0) {
+    return; // nothing converted yet
+  }
+  bool open1, open2;
+  float temp1 = averagedTemperature(0, open1);
+  float temp2 = averagedTemperature(1, open2);
 
-  if (cryoLiftEnabled && temp1 != NAN && temp2 != NAN) { // Send over I2C only if CryoLift is enabled and both temperatures are valid
+  if (binaryMode) {
+    sendBinaryFrame(temp1, open1, temp2, open2);
+  } else {
+    Serial.print("STATUS:");
+    reportStatus(1, temp1, open1);
+    reportStatus(2, temp2, open2);
+    Serial.println(";");
+  }
+
+  if (cryoLiftEnabled && !isnan(temp1) && !isnan(temp2)) { // Send over I2C only if CryoLift is enabled and both temperatures are valid
     float avgTemp = (temp1 + temp2) / 2.0;
 
     Wire.beginTransmission(cryoLift_Address);
@@ -88,15 +188,46 @@ void readAndSendTemperatures() {
   }
 }
 
-float readAndReportStatus(Adafruit_MAX31856 &max, int tcNumber) {
+float readTemperature(Adafruit_MAX31856 &max, bool &open) {
   uint8_t fault = max.readFault();
-  if (fault & MAX31856_FAULT_OPEN) {
-    Serial.print("T"); Serial.print(tcNumber); Serial.print(":Not Connected,");
+  open = fault & MAX31856_FAULT_OPEN;
+  if (open) {
     return NAN; // Return NaN to indicate a failure
+  }
+  return max.readThermocoupleTemperature();
+}
+
+void reportStatus(int tcNumber, float temperature, bool open) {
+  Serial.print("T"); Serial.print(tcNumber);
+  if (open) {
+    Serial.print(":Not Connected,");
   } else {
-    float temperature = max.readThermocoupleTemperature();
-    Serial.print("T"); Serial.print(tcNumber); Serial.print(":"); Serial.print(temperature); Serial.print(",");
-    return temperature; // Return the valid temperature
+    Serial.print(":"); Serial.print(temperature); Serial.print(",");
   }
 }
 
+void sendBinaryFrame(float temp1, bool open1, float temp2, bool open2) {
+  TemperatureFrame frame;
+  frame.sync[0] = 0xAA;
+  frame.sync[1] = 0x55;
+  frame.seq = frameSeq++;
+  frame.millis = millis();
+  frame.faults = (open1 ? 0x01 : 0) | (open2 ? 0x02 : 0);
+  frame.count = NUM_THERMOCOUPLES;
+  frame.temps[0] = temp1;
+  frame.temps[1] = temp2;
+  frame.crc = crc16((const uint8_t *)&frame.seq, offsetof(TemperatureFrame, crc) - offsetof(TemperatureFrame, seq));
+  Serial.write((const uint8_t *)&frame, sizeof(frame));
+}
+
+uint16_t crc16(const uint8_t *data, size_t length) {
+  // CRC-16/CCITT-FALSE: polynomial 0x1021, initial value 0xFFFF
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}